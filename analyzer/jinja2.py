@@ -1,22 +1,64 @@
 """
 Jinja2 environment configuration for Django.
 """
+from functools import lru_cache
 from jinja2 import Environment
 from django.contrib.staticfiles.storage import staticfiles_storage
 from django.urls import reverse
 
 
+@lru_cache(maxsize=2048)
+def _reverse_cached(viewname, args, kwargs):
+    """Memoized reverse() keyed on hashable args/kwargs."""
+    return reverse(viewname, args=args or None, kwargs=dict(kwargs) or None)
+
+
+def cached_reverse(viewname, args=None, kwargs=None, **options):
+    """
+    Drop-in replacement for reverse() that memoizes results.
+
+    URL reversing is deterministic for a given (viewname, args, kwargs), so
+    repeated url() calls in templates skip the resolver walk on cache hits.
+    Calls with extra options (urlconf, current_app, ...) or unhashable
+    arguments fall back to an uncached reverse().
+    """
+    if options:
+        return reverse(viewname, args=args, kwargs=kwargs, **options)
+
+    key_args = tuple(args) if args else ()
+    key_kwargs = frozenset(kwargs.items()) if kwargs else frozenset()
+    try:
+        hash((key_args, key_kwargs))
+    except TypeError:
+        return reverse(viewname, args=args, kwargs=kwargs)
+
+    return _reverse_cached(viewname, key_args, key_kwargs)
+
+
+@lru_cache(maxsize=1024)
+def cached_static(path):
+    """Memoized staticfiles_storage.url(); static URLs are fixed per process."""
+    return staticfiles_storage.url(path)
+
+
+# Django-specific functions exposed to templates, bound once at import
+DJANGO_GLOBALS = {
+    'static': cached_static,
+    'url': cached_reverse,
+}
+
+
 def environment(**options):
     """
     Create and configure Jinja2 environment for Django.
+
+    Django's Jinja2 backend builds this once per backend and already passes
+    autoescape=True and auto_reload=DEBUG, so production renders skip the
+    per-template stat() checks.
     """
     env = Environment(**options)
-    
+
     # Add Django-specific functions to Jinja2 environment
-    env.globals.update({
-        'static': staticfiles_storage.url,
-        'url': reverse,
-    })
-    
-    return env
+    env.globals.update(DJANGO_GLOBALS)
 
+    return env
@@ -3,44 +3,57 @@ URL configuration for analyzer project.
 
 This module defines the root URL patterns for the application.
 Routes are organized as follows:
-- /admin/ - Django admin interface
+- /api/ - GitHub Bot API endpoints
 - /api/auth/ - Authentication API endpoints
+- /api/security/ - Security Scanner API endpoints
+- /api/jwt/ - JWT Debugger API endpoints
 - /auth/ - Authentication web pages
 - /sso/ - SSO callbacks
-- /api/ - GitHub Bot API endpoints
+- /security/ - Security Scanner web page
+- /jwt-debugger/ - JWT Debugger web page
+- /admin/ - Django admin interface
 - / - GitHub Bot web pages
 """
 from django.contrib import admin
 from django.urls import path, include
+from github_bot import urls as github_bot_urls
 
+# github_bot routes are mounted under two namespaces; share one pattern list
+# so include() does not rediscover the urlconf module for each mount.
+_github_bot_patterns = (github_bot_urls.urlpatterns, 'github_bot')
+
+# Ordering: resolve() scans these prefixes top to bottom, so the busiest
+# routes (GitHub Bot chat/review APIs) come first and rarely used ones (admin)
+# come last. Keep the '' catch-all at the end; github_bot's api/ patterns do
+# not overlap api/auth/, api/jwt/ or api/security/, so those still resolve.
 urlpatterns = [
-    # Django Admin
-    path('admin/', admin.site.urls),
+    # GitHub Bot - API endpoints (e.g., /api/chat/, /api/review-code/)
+    path('api/', include(_github_bot_patterns, namespace='github_bot_api')),
     
     # Authentication - API endpoints (e.g., /api/auth/api/google/)
     path('api/auth/', include(('authentication.urls', 'authentication'), namespace='auth_api')),
     
-    # Authentication - Web pages (e.g., /auth/login/)
-    path('auth/', include(('authentication.urls', 'authentication'), namespace='auth_pages')),
-    
-    # Authentication - SSO callbacks (e.g., /sso/google/callback/)
-    path('sso/', include(('authentication.urls', 'authentication'), namespace='auth_sso')),
+    # Security Scanner - API endpoints (e.g., /api/security/scan/)
+    path('api/security/', include(('security_scanner.urls', 'security_scanner'), namespace='security_scanner_api')),
     
     # JWT Debugger - API endpoints
     path('api/jwt/', include(('jwt_debugger.urls', 'jwt_debugger'), namespace='jwt_debugger_api')),
-    # JWT Debugger - Web page
-    path('jwt-debugger/', include(('jwt_debugger.web_urls', 'jwt_debugger'), namespace='jwt_debugger_pages')),
     
-    # GitHub Bot - API endpoints (e.g., /api/chat/, /api/review-code/)
-    path('api/', include(('github_bot.urls', 'github_bot'), namespace='github_bot_api')),
+    # Authentication - Web pages (e.g., /auth/login/)
+    path('auth/', include(('authentication.web_urls', 'authentication'), namespace='auth_pages')),
     
-    # Security Scanner - API endpoints (e.g., /api/security/scan/)
-    path('api/security/', include(('security_scanner.urls', 'security_scanner'), namespace='security_scanner_api')),
+    # Authentication - SSO callbacks (e.g., /sso/google/callback/)
+    path('sso/', include(('authentication.sso_urls', 'authentication'), namespace='auth_sso')),
     
     # Security Scanner - Web page (e.g., /security/)
     path('security/', include(('security_scanner.web_urls', 'security_scanner'), namespace='security_scanner_pages')),
     
+    # JWT Debugger - Web page
+    path('jwt-debugger/', include(('jwt_debugger.web_urls', 'jwt_debugger'), namespace='jwt_debugger_pages')),
+    
+    # Django Admin
+    path('admin/', admin.site.urls),
+    
     # GitHub Bot - Web pages (e.g., /, /code-review/)
-    path('', include(('github_bot.urls', 'github_bot'), namespace='github_bot_pages')),
+    path('', include(_github_bot_patterns, namespace='github_bot_pages')),
 ]
-
@@ -6,6 +6,9 @@ This module configures Django admin interface for authentication models.
 
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
+from django.db.models import BooleanField, ExpressionWrapper, Q
+from django.db.models.functions import Now
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from authentication.models import User, RefreshToken
 
@@ -99,6 +102,7 @@ class RefreshTokenAdmin(admin.ModelAdmin):
         'created_at',
         'expires_at',
         'is_revoked',
+        'expired',
         'ip_address',
     )
     
@@ -139,6 +143,22 @@ class RefreshTokenAdmin(admin.ModelAdmin):
         }),
     )
     
+    def get_queryset(self, request):
+        """Compute expiry in the database once per query instead of per row."""
+        return super().get_queryset(request).annotate(
+            _is_expired=ExpressionWrapper(
+                Q(expires_at__lte=Now()),
+                output_field=BooleanField(),
+            )
+        )
+    
+    def expired(self, obj):
+        """Expiry flag for the change list, read from the annotation."""
+        return obj.is_expired
+    
+    expired.boolean = True
+    expired.short_description = "Expired"
+    
     def has_add_permission(self, request):
         """Disable manual token creation."""
         return False
@@ -151,10 +171,10 @@ class RefreshTokenAdmin(admin.ModelAdmin):
     
     def revoke_tokens(self, request, queryset):
         """Admin action to revoke selected tokens."""
-        count = 0
-        for token in queryset.filter(is_revoked=False):
-            token.revoke()
-            count += 1
+        count = queryset.filter(is_revoked=False).update(
+            is_revoked=True,
+            revoked_at=timezone.now(),
+        )
         
         self.message_user(
             request,
@@ -165,10 +185,7 @@ class RefreshTokenAdmin(admin.ModelAdmin):
     
     def delete_expired_tokens(self, request, queryset):
         """Admin action to delete expired tokens."""
-        from django.utils import timezone
-        expired = queryset.filter(expires_at__lt=timezone.now())
-        count = expired.count()
-        expired.delete()
+        count, _ = queryset.filter(expires_at__lt=timezone.now()).delete()
         
         self.message_user(
             request,
@@ -5,6 +5,28 @@ This module defines the configuration for the authentication app.
 """
 
 from django.apps import AppConfig
+import logging
+import os
+import sys
+
+logger = logging.getLogger(__name__)
+
+
+def _should_warm_mongodb() -> bool:
+    """
+    Decide whether this process serves requests and should connect eagerly.
+    
+    Management commands (migrate, test, collectstatic, ...) skip the warm-up,
+    as does runserver's autoreloader parent; its child sets RUN_MAIN.
+    """
+    if not os.environ.get('MONGODB_URI'):
+        return False
+    
+    if os.path.basename(sys.argv[0]) == 'manage.py':
+        command = sys.argv[1] if len(sys.argv) > 1 else ''
+        return command == 'runserver' and os.environ.get('RUN_MAIN') == 'true'
+    
+    return True
 
 
 class AuthenticationConfig(AppConfig):
@@ -19,6 +41,19 @@ class AuthenticationConfig(AppConfig):
     def ready(self):
         """
         Import signals and perform app initialization tasks when Django starts.
+        
+        Connects the MongoDB user and token services up front, so the first
+        request a worker serves doesn't pay for the TLS handshake, ping and
+        index checks.
         """
-        # Import signals here if needed
-        pass
+        if not _should_warm_mongodb():
+            return
+        
+        from authentication.services import get_token_service, get_user_service
+        
+        try:
+            get_user_service()
+            get_token_service()
+        except Exception as e:
+            # Not fatal: the services connect again on first use
+            logger.warning("MongoDB warm-up failed: %s", e)
@@ -55,7 +55,7 @@ class JWTCookieAuthentication(authentication.BaseAuthentication):
             
             # Fetch user from MongoDB
             user_service = get_user_service()
-            user_data = user_service.find_user_by_email(email)
+            user_data = user_service.find_user_by_email_cached(email)
             
             if not user_data:
                 raise exceptions.AuthenticationFailed('User not found')
@@ -77,7 +77,7 @@ class JWTCookieAuthentication(authentication.BaseAuthentication):
             raise exceptions.AuthenticationFailed(f'Invalid token: {str(e)}')
         except Exception as e:
             # Any other error
-            logger.error(f'Unexpected error in JWT cookie authentication: {str(e)}')
+            logger.error('Unexpected error in JWT cookie authentication: %s', e)
             raise exceptions.AuthenticationFailed('Authentication failed')
     
     def authenticate_header(self, request):
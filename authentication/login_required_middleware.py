@@ -5,9 +5,9 @@ Redirects unauthenticated users to login page.
 Only Google SSO and callback endpoints are exempt.
 """
 
-from django.shortcuts import redirect
-from django.http import JsonResponse
+from django.http import HttpResponse, HttpResponseRedirect
 from django.conf import settings
+import json
 import logging
 
 logger = logging.getLogger(__name__)
@@ -46,8 +46,28 @@ class LoginRequiredMiddleware:
         '/admin/',
     ]
     
+    API_PATH_PREFIX = '/api/'
+    JSON_MEDIA_TYPE = 'application/json'
+    
+    LOGIN_URL = '/auth/login/'
+    LOGIN_REDIRECT_PREFIX = LOGIN_URL + '?next='
+    
+    # 401 body for API requests, serialized once instead of per response
+    UNAUTHORIZED_BODY = json.dumps(
+        {'error': 'Authentication required', 'code': 'UNAUTHORIZED'}
+    ).encode()
+    
     def __init__(self, get_response):
         self.get_response = get_response
+        
+        # Build the exempt-prefix tuple once; str.startswith(tuple) checks
+        # every prefix in C instead of a per-request Python loop.
+        prefixes = list(self.EXEMPT_PATHS)
+        for url_setting in ('STATIC_URL', 'MEDIA_URL'):
+            prefix = getattr(settings, url_setting, None)
+            if prefix:
+                prefixes.append(prefix)
+        self._exempt_prefixes = tuple(prefixes)
     
     def __call__(self, request):
         # Get the request path
@@ -61,18 +81,17 @@ class LoginRequiredMiddleware:
         if not request.user.is_authenticated:
             # Check if this is an API request
             if self.is_api_request(request):
-                return JsonResponse(
-                    {'error': 'Authentication required', 'code': 'UNAUTHORIZED'},
-                    status=401
+                return HttpResponse(
+                    self.UNAUTHORIZED_BODY,
+                    status=401,
+                    content_type=self.JSON_MEDIA_TYPE,
                 )
             
             # Redirect to login page, preserving the original URL
-            login_url = '/auth/login/'
-            
             # Don't redirect if already on login
-            if path != login_url:
+            if path != self.LOGIN_URL:
                 # Add 'next' parameter to redirect back after login
-                return redirect(f'{login_url}?next={path}')
+                return HttpResponseRedirect(self.LOGIN_REDIRECT_PREFIX + path)
         
         return self.get_response(request)
     
@@ -86,22 +105,7 @@ class LoginRequiredMiddleware:
         Returns:
             bool: True if path is exempt, False otherwise
         """
-        # Check exact matches
-        if path in self.EXEMPT_PATHS:
-            return True
-        
-        # Check if path starts with any exempt path
-        for exempt_path in self.EXEMPT_PATHS:
-            if path.startswith(exempt_path):
-                return True
-        
-        # Check if it's a static or media file
-        if hasattr(settings, 'STATIC_URL') and path.startswith(settings.STATIC_URL):
-            return True
-        if hasattr(settings, 'MEDIA_URL') and path.startswith(settings.MEDIA_URL):
-            return True
-        
-        return False
+        return path.startswith(self._exempt_prefixes)
     
     def is_api_request(self, request):
         """
@@ -113,18 +117,16 @@ class LoginRequiredMiddleware:
         Returns:
             bool: True if API request, False otherwise
         """
-        # Check URL path
-        if request.path.startswith('/api/'):
+        # Check URL path (cheapest test first)
+        if request.path.startswith(self.API_PATH_PREFIX):
             return True
         
-        # Check Accept header
-        accept = request.META.get('HTTP_ACCEPT', '')
-        if 'application/json' in accept:
-            return True
+        meta = request.META
         
-        # Check Content-Type header
-        content_type = request.META.get('CONTENT_TYPE', '')
-        if 'application/json' in content_type:
+        # Check Accept header - only the first (preferred) media type matters
+        accept = meta.get('HTTP_ACCEPT', '').partition(',')[0]
+        if accept.lstrip().startswith(self.JSON_MEDIA_TYPE):
             return True
         
-        return False
+        # Check Content-Type header
+        return meta.get('CONTENT_TYPE', '').startswith(self.JSON_MEDIA_TYPE)
@@ -4,7 +4,9 @@ Django management command to clean up expired refresh tokens.
 Usage:
     python manage.py cleanup_expired_tokens
     
-This should be run periodically via cron job or task scheduler.
+Expired tokens are removed automatically by the MongoDB TTL index on
+expires_at, so scheduling this command is no longer required. It remains
+available for an immediate purge.
 """
 
 from django.core.management.base import BaseCommand
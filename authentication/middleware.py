@@ -4,6 +4,7 @@ Authentication Middleware
 Custom middleware for JWT cookie-based authentication with MongoDB.
 """
 
+from django.conf import settings
 from django.utils.functional import SimpleLazyObject
 from authentication.services import JWTService, TokenCookieAuthentication, get_user_service
 import logging
@@ -15,19 +16,37 @@ class MongoUser:
     """
     A user-like object for MongoDB users.
     Provides compatibility with Django's authentication system.
+    
+    Only the fields read on every request are copied out of the document;
+    profile fields are read from the underlying document on access.
     """
     
+    __slots__ = ('_data', 'id', 'email', 'is_active')
+    
+    is_authenticated = True
+    is_anonymous = False
+    
     def __init__(self, user_data):
         self._data = user_data
         self.id = str(user_data.get('_id', ''))
         self.email = user_data.get('email', '')
-        self.name = user_data.get('name', '')
-        self.first_name = user_data.get('first_name', '')
-        self.last_name = user_data.get('last_name', '')
-        self.profile_picture = user_data.get('profile_picture', '')
         self.is_active = user_data.get('is_active', True)
-        self.is_authenticated = True
-        self.is_anonymous = False
+    
+    @property
+    def name(self):
+        return self._data.get('name', '')
+    
+    @property
+    def first_name(self):
+        return self._data.get('first_name', '')
+    
+    @property
+    def last_name(self):
+        return self._data.get('last_name', '')
+    
+    @property
+    def profile_picture(self):
+        return self._data.get('profile_picture', '')
     
     def __str__(self):
         return self.email
@@ -41,6 +60,8 @@ class AnonymousUser:
     Anonymous user for unauthenticated requests.
     """
     
+    __slots__ = ()
+    
     id = None
     email = ''
     name = ''
@@ -52,6 +73,10 @@ class AnonymousUser:
         return 'AnonymousUser'
 
 
+# AnonymousUser carries no per-request state, so one instance is shared
+ANONYMOUS_USER = AnonymousUser()
+
+
 class JWTCookieAuthenticationMiddleware:
     """
     Middleware to authenticate users via JWT tokens stored in httpOnly cookies.
@@ -63,40 +88,51 @@ class JWTCookieAuthenticationMiddleware:
     
     def __init__(self, get_response):
         self.get_response = get_response
+        
+        # Static and media assets never need the authenticated user
+        self._skip_prefixes = tuple(
+            prefix for prefix in (
+                getattr(settings, 'STATIC_URL', None),
+                getattr(settings, 'MEDIA_URL', None),
+            ) if prefix
+        )
     
     def __call__(self, request):
         """
         Process the request and authenticate user if valid token is present.
         """
+        if self._skip_prefixes and request.path.startswith(self._skip_prefixes):
+            request.user = ANONYMOUS_USER
+            request.user_email = None
+            return self.get_response(request)
+        
+        access_token = TokenCookieAuthentication.get_access_token_from_request(request)
+        
+        if not access_token:
+            # No cookie: nothing to resolve lazily, use the shared anonymous user
+            request.user = ANONYMOUS_USER
+            request.user_email = None
+            return self.get_response(request)
+        
         # Use SimpleLazyObject to defer user lookup until needed
-        request.user = SimpleLazyObject(lambda: self._get_user_from_token(request))
+        request.user = SimpleLazyObject(lambda: self._get_user_from_token(access_token))
         
         # Also set user_email on request for easy access
-        def get_user_email():
-            user = request.user
-            return user.email if hasattr(user, 'email') and user.email else None
-        
-        request.user_email = SimpleLazyObject(get_user_email)
+        request.user_email = SimpleLazyObject(lambda: request.user.email or None)
         
         response = self.get_response(request)
         return response
     
-    def _get_user_from_token(self, request):
+    def _get_user_from_token(self, access_token):
         """
-        Get user from JWT token in cookies.
+        Get user from the JWT access token taken from cookies.
         
         Args:
-            request: HTTP request object
+            access_token: Access token string from the request cookies
         
         Returns:
             MongoUser instance or AnonymousUser
         """
-        # Get access token from cookies
-        access_token = TokenCookieAuthentication.get_access_token_from_request(request)
-        
-        if not access_token:
-            return AnonymousUser()
-        
         try:
             # Validate and decode the token
             payload = JWTService.verify_access_token(access_token)
@@ -105,27 +141,27 @@ class JWTCookieAuthenticationMiddleware:
             email = payload.get('email')
             
             if not email:
-                return AnonymousUser()
+                return ANONYMOUS_USER
             
             # Fetch user from MongoDB
             user_service = get_user_service()
-            user_data = user_service.find_user_by_email(email)
+            user_data = user_service.find_user_by_email_cached(email)
             
             if not user_data:
-                logger.warning(f"User with email {email} not found in MongoDB")
-                return AnonymousUser()
+                logger.warning("User with email %s not found in MongoDB", email)
+                return ANONYMOUS_USER
             
             if not user_data.get('is_active', True):
-                logger.warning(f"User {email} is inactive")
-                return AnonymousUser()
+                logger.warning("User %s is inactive", email)
+                return ANONYMOUS_USER
             
             return MongoUser(user_data)
             
         except ValueError as e:
             # Token is invalid or expired
-            logger.debug(f"Token validation failed: {str(e)}")
-            return AnonymousUser()
+            logger.debug("Token validation failed: %s", e)
+            return ANONYMOUS_USER
         except Exception as e:
             # Any other error
-            logger.error(f"Unexpected error in authentication: {str(e)}")
-            return AnonymousUser()
+            logger.error("Unexpected error in authentication: %s", e)
+            return ANONYMOUS_USER
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-16 07:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='refreshtoken',
+            index=models.Index(fields=['is_revoked', 'expires_at'], name='rt_revoked_exp_idx'),
+        ),
+    ]
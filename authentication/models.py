@@ -6,6 +6,7 @@ This module defines custom user models and authentication-related models.
 
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
 
@@ -130,6 +131,8 @@ class RefreshToken(models.Model):
             models.Index(fields=['user', 'is_revoked']),
             models.Index(fields=['jti']),
             models.Index(fields=['expires_at']),
+            # Admin list filter and "live token" scans: is_revoked=False AND expires_at
+            models.Index(fields=['is_revoked', 'expires_at'], name='rt_revoked_exp_idx'),
         ]
     
     def __str__(self):
@@ -137,15 +140,21 @@ class RefreshToken(models.Model):
     
     def revoke(self):
         """Revoke this refresh token."""
-        from django.utils import timezone
         self.is_revoked = True
         self.revoked_at = timezone.now()
         self.save(update_fields=['is_revoked', 'revoked_at'])
     
     @property
     def is_expired(self):
-        """Check if the token has expired."""
-        from django.utils import timezone
+        """
+        Check if the token has expired.
+        
+        Uses the database-computed '_is_expired' annotation when the row was
+        loaded through RefreshTokenAdmin, avoiding a timezone.now() per row.
+        """
+        expired = self.__dict__.get('_is_expired')
+        if expired is not None:
+            return expired
         return timezone.now() >= self.expires_at
     
     @property
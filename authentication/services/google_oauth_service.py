@@ -5,15 +5,73 @@ This module handles Google OAuth authentication flow.
 Google SSO is the ONLY authentication method.
 """
 
-from google.oauth2 import id_token
-from google.auth.transport import requests as google_requests
-from google_auth_oauthlib.flow import Flow
 from django.conf import settings
 from authentication.services.mongodb_user_service import get_user_service
+from authentication.services.single_flight import SingleFlight
+from functools import lru_cache
+from typing import TYPE_CHECKING, Optional, Tuple
+import hashlib
+import json
 import logging
+import re
+import secrets
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from urllib.parse import urlencode
+
+# The Google client libraries (and the cryptography/oauthlib stacks behind
+# them) are imported inside the methods that use them, so workers that never
+# serve a login do not pay for loading them.
+if TYPE_CHECKING:
+    from google_auth_oauthlib.flow import Flow
 
 logger = logging.getLogger(__name__)
 
+# Google's ID-token signing certificates ({kid: x509 PEM}); rotated rarely and
+# served with a Cache-Control max-age, so they are fetched once per max-age.
+GOOGLE_CERTS_URL = 'https://www.googleapis.com/oauth2/v1/certs'
+DEFAULT_CERTS_MAX_AGE_SECONDS = 3600
+_MAX_AGE_RE = re.compile(r'max-age=(\d+)')
+
+# One connection pool for all calls to Google (token exchange, certificates),
+# so warm workers reuse TCP+TLS connections instead of handshaking per login.
+_HTTPS_ADAPTER = HTTPAdapter(pool_connections=10, pool_maxsize=50)
+
+# Verified ID-token user info keyed by SHA-256 of the token, kept until 'exp'
+ID_TOKEN_CACHE_MAX_ENTRIES = 1024
+
+
+@lru_cache(maxsize=8)
+def _client_config(redirect_uri: str) -> dict:
+    """Google client-secrets style config for a redirect URI, built once."""
+    return {
+        'web': {
+            'client_id': settings.GOOGLE_OAUTH_CLIENT_ID,
+            'client_secret': settings.GOOGLE_OAUTH_CLIENT_SECRET,
+            'auth_uri': 'https://accounts.google.com/o/oauth2/auth',
+            'token_uri': 'https://oauth2.googleapis.com/token',
+            'redirect_uris': [redirect_uri],
+        }
+    }
+
+
+@lru_cache(maxsize=16)
+def _authorization_base_url(redirect_uri: str) -> str:
+    """Authorization URL without the per-request state, built once per redirect URI."""
+    client_config = _client_config(redirect_uri)['web']
+    params = {
+        'response_type': 'code',
+        'client_id': client_config['client_id'],
+        'redirect_uri': redirect_uri,
+        'scope': ' '.join(GoogleOAuthService.SCOPES),
+        'access_type': 'offline',
+        'include_granted_scopes': 'true',
+        'prompt': 'consent',
+    }
+    return client_config['auth_uri'] + '?' + urlencode(params)
+
 
 class GoogleOAuthService:
     """
@@ -32,39 +90,58 @@ class GoogleOAuthService:
         'https://www.googleapis.com/auth/userinfo.profile',
     ]
     
+    # Shared transport and signing-certificate cache (see _get_google_certs)
+    _http_request = None
+    _certs = None
+    _certs_expires_at = 0.0
+    _certs_lock = threading.Lock()
+    
+    # sha256(id_token) -> (user_info, exp)
+    _id_token_cache = {}
+    
+    # Concurrent exchanges of the same authorization code share one request
+    _exchange_flight = SingleFlight()
+    
     @staticmethod
-    def get_authorization_url(redirect_uri: str) -> str:
+    def _build_flow(redirect_uri: str) -> 'Flow':
         """
-        Generate Google OAuth authorization URL.
+        Build an OAuth flow for the given redirect URI.
+        
+        A Flow carries per-login state (OAuth state, PKCE verifier, fetched
+        token), so a new one is created per call; the client config it is
+        built from and the HTTPS connection pool are shared.
         
         Args:
             redirect_uri: The redirect URI for OAuth callback
         
         Returns:
-            str: Authorization URL
+            Flow: Configured OAuth flow
         """
+        from google_auth_oauthlib.flow import Flow
+        
         flow = Flow.from_client_config(
-            client_config={
-                'web': {
-                    'client_id': settings.GOOGLE_OAUTH_CLIENT_ID,
-                    'client_secret': settings.GOOGLE_OAUTH_CLIENT_SECRET,
-                    'auth_uri': 'https://accounts.google.com/o/oauth2/auth',
-                    'token_uri': 'https://oauth2.googleapis.com/token',
-                    'redirect_uris': [redirect_uri],
-                }
-            },
+            client_config=_client_config(redirect_uri),
             scopes=GoogleOAuthService.SCOPES
         )
-        
         flow.redirect_uri = redirect_uri
+        flow.oauth2session.mount('https://', _HTTPS_ADAPTER)
+        return flow
+    
+    @staticmethod
+    def get_authorization_url(redirect_uri: str, state: Optional[str] = None) -> str:
+        """
+        Generate Google OAuth authorization URL.
         
-        authorization_url, state = flow.authorization_url(
-            access_type='offline',
-            include_granted_scopes='true',
-            prompt='consent'
-        )
+        Args:
+            redirect_uri: The redirect URI for OAuth callback
+            state: Optional OAuth state value (a random one is generated if omitted)
         
-        return authorization_url
+        Returns:
+            str: Authorization URL
+        """
+        if state is None:
+            state = secrets.token_urlsafe(16)
+        return _authorization_base_url(redirect_uri) + '&' + urlencode({'state': state})
     
     @staticmethod
     def exchange_code_for_token(code: str, redirect_uri: str) -> dict:
@@ -81,21 +158,18 @@ class GoogleOAuthService:
         Raises:
             ValueError: If token exchange fails
         """
+        return GoogleOAuthService._exchange_flight.do(
+            (code, redirect_uri),
+            GoogleOAuthService._exchange_code_for_token,
+            code,
+            redirect_uri,
+        )
+    
+    @staticmethod
+    def _exchange_code_for_token(code: str, redirect_uri: str) -> dict:
+        """Perform the code exchange against Google's token endpoint."""
         try:
-            flow = Flow.from_client_config(
-                client_config={
-                    'web': {
-                        'client_id': settings.GOOGLE_OAUTH_CLIENT_ID,
-                        'client_secret': settings.GOOGLE_OAUTH_CLIENT_SECRET,
-                        'auth_uri': 'https://accounts.google.com/o/oauth2/auth',
-                        'token_uri': 'https://oauth2.googleapis.com/token',
-                        'redirect_uris': [redirect_uri],
-                    }
-                },
-                scopes=GoogleOAuthService.SCOPES
-            )
-            
-            flow.redirect_uri = redirect_uri
+            flow = GoogleOAuthService._build_flow(redirect_uri)
             flow.fetch_token(code=code)
             
             credentials = flow.credentials
@@ -131,21 +205,35 @@ class GoogleOAuthService:
         Raises:
             ValueError: If token verification fails
         """
+        cache_key = hashlib.sha256(id_token_str.encode()).hexdigest()
+        cached = GoogleOAuthService._id_token_cache.get(cache_key)
+        if cached is not None and cached[1] > time.time():
+            return dict(cached[0])
+        
+        from google.auth import jwt as google_jwt
+        
         try:
-            # Verify the token
-            idinfo = id_token.verify_oauth2_token(
+            # Verify the token offline against the cached signing certificates
+            certs = GoogleOAuthService._get_google_certs()
+            kid = google_jwt.decode_header(id_token_str).get('kid')
+            if kid and kid not in certs:
+                # Google rotated its keys since the last fetch
+                certs = GoogleOAuthService._get_google_certs(force_refresh=True)
+            
+            idinfo = google_jwt.decode(
                 id_token_str,
-                google_requests.Request(),
-                settings.GOOGLE_OAUTH_CLIENT_ID
+                certs=certs,
+                audience=settings.GOOGLE_OAUTH_CLIENT_ID,
             )
             
             # Verify the issuer
             if idinfo['iss'] not in ['accounts.google.com', 'https://accounts.google.com']:
                 raise ValueError('Invalid token issuer')
             
-            return {
+            user_info = {
                 'google_id': idinfo['sub'],
-                'email': idinfo.get('email', ''),
+                # Normalized once here; every later lookup uses this form
+                'email': idinfo.get('email', '').lower(),
                 'email_verified': idinfo.get('email_verified', False),
                 'first_name': idinfo.get('given_name', ''),
                 'last_name': idinfo.get('family_name', ''),
@@ -156,6 +244,57 @@ class GoogleOAuthService:
         except ValueError as e:
             logger.error(f"Token verification failed: {str(e)}")
             raise ValueError(f"Invalid token: {str(e)}")
+        
+        id_token_cache = GoogleOAuthService._id_token_cache
+        if len(id_token_cache) >= ID_TOKEN_CACHE_MAX_ENTRIES:
+            id_token_cache.clear()
+        id_token_cache[cache_key] = (user_info, idinfo.get('exp', 0))
+        
+        return dict(user_info)
+    
+    @classmethod
+    def _get_google_certs(cls, force_refresh: bool = False) -> dict:
+        """
+        Return Google's ID-token signing certificates, fetching them only when
+        the cached copy has passed its Cache-Control max-age.
+        
+        Args:
+            force_refresh: Refetch even if the cached certificates are fresh
+        
+        Returns:
+            dict: Mapping of key id to x509 certificate
+        
+        Raises:
+            TransportError: If the certificates cannot be fetched
+        """
+        if not force_refresh and cls._certs is not None and time.monotonic() < cls._certs_expires_at:
+            return cls._certs
+        
+        with cls._certs_lock:
+            if not force_refresh and cls._certs is not None and time.monotonic() < cls._certs_expires_at:
+                return cls._certs
+            
+            from google.auth import exceptions as google_exceptions
+            
+            if cls._http_request is None:
+                from google.auth.transport import requests as google_requests
+                
+                session = requests.Session()
+                session.mount('https://', _HTTPS_ADAPTER)
+                cls._http_request = google_requests.Request(session=session)
+            
+            response = cls._http_request(GOOGLE_CERTS_URL, method='GET')
+            if response.status != 200:
+                raise google_exceptions.TransportError(
+                    f"Could not fetch certificates at {GOOGLE_CERTS_URL}"
+                )
+            
+            match = _MAX_AGE_RE.search(response.headers.get('cache-control', ''))
+            max_age = int(match.group(1)) if match else DEFAULT_CERTS_MAX_AGE_SECONDS
+            
+            cls._certs = json.loads(response.data.decode('utf-8'))
+            cls._certs_expires_at = time.monotonic() + max_age
+            return cls._certs
     
     @staticmethod
     def get_user_info_from_code(code: str, redirect_uri: str) -> dict:
@@ -186,6 +325,10 @@ class GoogleOAuthService:
         """
         Check if a user with the given email exists in MongoDB.
         
+        For existence checks where the document isn't needed. Login paths
+        should call login_if_exists() instead of checking first and then
+        fetching.
+        
         Args:
             email: User's email address
         
@@ -195,6 +338,28 @@ class GoogleOAuthService:
         user_service = get_user_service()
         return user_service.user_exists(email)
     
+    @staticmethod
+    def login_if_exists(email: str) -> Optional[dict]:
+        """
+        Authenticate a user by email if they already have an account.
+        
+        The user comes from update_user_login(), which looks it up (usually
+        from cache) and records last_login without waiting on the write, so
+        callers need no separate check_user_exists() query first.
+        
+        Args:
+            email: User's email address
+        
+        Returns:
+            dict: Updated user document, or None if no such user exists
+        """
+        user_service = get_user_service()
+        user = user_service.update_user_login(email)
+        
+        if user:
+            logger.info(f"User authenticated: {email}")
+        return user
+    
     @staticmethod
     def authenticate_existing_user(email: str) -> dict:
         """
@@ -210,13 +375,11 @@ class GoogleOAuthService:
         Raises:
             ValueError: If user doesn't exist
         """
-        user_service = get_user_service()
-        user = user_service.update_user_login(email)
+        user = GoogleOAuthService.login_if_exists(email)
         
         if not user:
             raise ValueError(f"User with email {email} not found")
         
-        logger.info(f"User authenticated: {email}")
         return user
     
     @staticmethod
@@ -250,15 +413,44 @@ class GoogleOAuthService:
             raise ValueError(f"Failed to create user: {str(e)}")
     
     @staticmethod
-    def get_user_by_email(email: str) -> dict:
+    def get_or_create_user(user_info: dict) -> Tuple[dict, bool]:
+        """
+        Log in the user from Google SSO info, creating the account if needed.
+        
+        Args:
+            user_info: User information from Google OAuth (see create_new_user)
+        
+        Returns:
+            tuple: (user document, True if the account was created)
+        
+        Raises:
+            ValueError: If user creation fails
+        """
+        user_service = get_user_service()
+        
+        try:
+            user, created = user_service.get_or_create_user(user_info)
+        except Exception as e:
+            logger.error(f"Failed to create user: {str(e)}")
+            raise ValueError(f"Failed to create user: {str(e)}")
+        
+        if created:
+            logger.info(f"New user created via Google SSO: {user_info['email']}")
+        else:
+            logger.info(f"User authenticated: {user_info['email']}")
+        return user, created
+    
+    @staticmethod
+    def get_user_by_email(email: str, projection: Optional[dict] = None) -> dict:
         """
         Get a user by email from MongoDB.
         
         Args:
             email: User's email address
+            projection: Optional MongoDB projection to limit returned fields
         
         Returns:
             dict: User document or None
         """
         user_service = get_user_service()
-        return user_service.find_user_by_email(email)
+        return user_service.find_user_by_email(email, projection=projection)
@@ -6,17 +6,73 @@ Implements secure token handling with httpOnly cookies.
 Uses MongoDB for token storage.
 """
 
-from datetime import timedelta
+from datetime import datetime, timedelta, timezone
 from django.conf import settings
-from django.utils import timezone
 import jwt
 from authentication.services.mongodb_token_service import get_token_service
 from authentication.services.mongodb_user_service import get_user_service
-import uuid
+from authentication.services.single_flight import SingleFlight
+import base64
+import hmac
+import json
+import secrets
+import threading
+import time
 import logging
 
 logger = logging.getLogger(__name__)
 
+def _b64url(data: bytes) -> bytes:
+    """Unpadded base64url encoding used for JWT segments."""
+    return base64.urlsafe_b64encode(data).rstrip(b'=')
+
+
+# Every token this service issues has the same header, so encode it once
+_HS256_HEADER_SEGMENT = _b64url(
+    json.dumps({'alg': 'HS256', 'typ': 'JWT'}, separators=(',', ':')).encode()
+)
+
+
+def encode_hs256(payload: dict) -> str:
+    """
+    Sign a payload as an HS256 JWT with SECRET_KEY.
+    
+    Time claims (iat, exp) must already be POSIX seconds. Produces the
+    same compact token as jwt.encode(payload, SECRET_KEY, algorithm='HS256')
+    without PyJWT's per-call header handling and payload copying.
+    Verification still goes through jwt.decode.
+    
+    Args:
+        payload: JWT claims
+    
+    Returns:
+        str: Encoded token
+    """
+    payload_segment = _b64url(
+        json.dumps(payload, separators=(',', ':')).encode()
+    )
+    signing_input = _HS256_HEADER_SEGMENT + b'.' + payload_segment
+    signature = hmac.digest(settings.SECRET_KEY.encode(), signing_input, 'sha256')
+    return (signing_input + b'.' + _b64url(signature)).decode('ascii')
+
+
+# Verified access-token payloads keyed by the raw token: {token: (payload, exp)}.
+# Entries are only served until the token's own 'exp', so expiry still applies.
+# Inserts and eviction hold _access_payload_lock; lookups are a single dict.get.
+_access_payload_cache = {}
+_access_payload_lock = threading.Lock()
+ACCESS_PAYLOAD_CACHE_MAX_ENTRIES = 10000
+
+# Concurrent refreshes with the same refresh token share one verification
+_refresh_flight = SingleFlight()
+
+# Recent positive revocation checks: {jti: (expires_at monotonic, generation)}.
+# Any local revocation bumps the generation, invalidating every entry at once.
+REFRESH_VALIDITY_TTL_SECONDS = 10
+REFRESH_VALIDITY_CACHE_MAX_ENTRIES = 10000
+_refresh_validity_cache = {}
+_revocation_generation = 0
+
 
 class JWTService:
     """
@@ -32,6 +88,17 @@ class JWTService:
     # Token expiry durations
     ACCESS_TOKEN_LIFETIME = timedelta(minutes=30)
     REFRESH_TOKEN_LIFETIME = timedelta(days=7)
+    ACCESS_TOKEN_LIFETIME_SECONDS = int(ACCESS_TOKEN_LIFETIME.total_seconds())
+    REFRESH_TOKEN_LIFETIME_SECONDS = int(REFRESH_TOKEN_LIFETIME.total_seconds())
+    
+    # Cookie attributes shared by both token cookies, built once
+    COOKIE_SECURE = not settings.DEBUG  # HTTPS only in production
+    COOKIE_KWARGS = {
+        'httponly': True,  # Prevents JavaScript access
+        'secure': COOKIE_SECURE,
+        'samesite': 'Lax',  # CSRF protection
+        'path': '/',
+    }
     
     @staticmethod
     def generate_tokens(user: dict, request=None) -> dict:
@@ -45,8 +112,8 @@ class JWTService:
         Returns:
             dict: Contains 'access', 'refresh' tokens and expiry info
         """
-        now = timezone.now()
-        jti = str(uuid.uuid4())
+        now = int(time.time())
+        jti = secrets.token_urlsafe(16)
         user_id = str(user['_id'])
         email = user['email']
         
@@ -55,23 +122,24 @@ class JWTService:
             'user_id': user_id,
             'email': email,
             'name': user.get('name', ''),
-            'exp': now + JWTService.ACCESS_TOKEN_LIFETIME,
+            'exp': now + JWTService.ACCESS_TOKEN_LIFETIME_SECONDS,
             'iat': now,
             'token_type': 'access',
         }
-        access_token = jwt.encode(access_payload, settings.SECRET_KEY, algorithm='HS256')
+        access_token = encode_hs256(access_payload)
         
         # Generate refresh token
-        refresh_exp = now + JWTService.REFRESH_TOKEN_LIFETIME
+        refresh_exp = now + JWTService.REFRESH_TOKEN_LIFETIME_SECONDS
         refresh_payload = {
             'user_id': user_id,
             'email': email,
+            'name': user.get('name', ''),
             'jti': jti,
             'exp': refresh_exp,
             'iat': now,
             'token_type': 'refresh',
         }
-        refresh_token = jwt.encode(refresh_payload, settings.SECRET_KEY, algorithm='HS256')
+        refresh_token = encode_hs256(refresh_payload)
         
         # Store refresh token in MongoDB
         token_service = get_token_service()
@@ -79,7 +147,8 @@ class JWTService:
             user_email=email,
             token=refresh_token,
             jti=jti,
-            expires_at=refresh_exp,
+            # Stored as a BSON date so the TTL index can expire it
+            expires_at=datetime.fromtimestamp(refresh_exp, tz=timezone.utc),
             ip_address=JWTService._get_client_ip(request) if request else None,
             user_agent=request.META.get('HTTP_USER_AGENT', '') if request else '',
         )
@@ -87,8 +156,8 @@ class JWTService:
         return {
             'access': access_token,
             'refresh': refresh_token,
-            'access_expires_in': int(JWTService.ACCESS_TOKEN_LIFETIME.total_seconds()),
-            'refresh_expires_in': int(JWTService.REFRESH_TOKEN_LIFETIME.total_seconds()),
+            'access_expires_in': JWTService.ACCESS_TOKEN_LIFETIME_SECONDS,
+            'refresh_expires_in': JWTService.REFRESH_TOKEN_LIFETIME_SECONDS,
         }
     
     @staticmethod
@@ -105,12 +174,22 @@ class JWTService:
         Raises:
             ValueError: If token is invalid or expired
         """
+        now = time.time()
+        entry = _access_payload_cache.get(token)
+        if entry is not None and entry[1] > now:
+            return entry[0]
+        
         try:
             payload = jwt.decode(token, settings.SECRET_KEY, algorithms=['HS256'])
             
             if payload.get('token_type') != 'access':
                 raise ValueError("Invalid token type")
             
+            with _access_payload_lock:
+                if len(_access_payload_cache) >= ACCESS_PAYLOAD_CACHE_MAX_ENTRIES:
+                    JWTService._evict_expired_payloads(now)
+                _access_payload_cache[token] = (payload, payload.get('exp', 0))
+            
             return payload
             
         except jwt.ExpiredSignatureError:
@@ -118,6 +197,19 @@ class JWTService:
         except jwt.InvalidTokenError as e:
             raise ValueError(f"Invalid token: {str(e)}")
     
+    @staticmethod
+    def _evict_expired_payloads(now: float):
+        """
+        Drop expired cached payloads, or all of them if none have expired.
+        
+        Must be called with _access_payload_lock held.
+        """
+        expired = [token for token, (_, exp) in _access_payload_cache.items() if exp <= now]
+        for token in expired:
+            del _access_payload_cache[token]
+        if len(_access_payload_cache) >= ACCESS_PAYLOAD_CACHE_MAX_ENTRIES:
+            _access_payload_cache.clear()
+    
     @staticmethod
     def verify_refresh_token(token: str) -> dict:
         """
@@ -131,6 +223,7 @@ class JWTService:
         
         Raises:
             ValueError: If token is invalid, expired, or revoked
+            PyMongoError: If the revocation state could not be read
         """
         try:
             payload = jwt.decode(token, settings.SECRET_KEY, algorithms=['HS256'])
@@ -139,10 +232,7 @@ class JWTService:
                 raise ValueError("Invalid token type")
             
             # Check if token is revoked in MongoDB
-            token_service = get_token_service()
-            jti = payload.get('jti')
-            
-            if not token_service.is_token_valid(jti):
+            if not JWTService._is_refresh_token_active(payload.get('jti')):
                 raise ValueError("Token has been revoked")
             
             return payload
@@ -152,6 +242,38 @@ class JWTService:
         except jwt.InvalidTokenError as e:
             raise ValueError(f"Invalid token: {str(e)}")
     
+    @staticmethod
+    def _is_refresh_token_active(jti: str) -> bool:
+        """
+        Check a refresh token's revocation state, reusing a recent positive
+        answer for up to REFRESH_VALIDITY_TTL_SECONDS.
+        
+        Args:
+            jti: JWT ID of the refresh token
+        
+        Returns:
+            bool: True if the token exists and is not revoked
+        """
+        now = time.monotonic()
+        entry = _refresh_validity_cache.get(jti)
+        if entry is not None and entry[0] > now and entry[1] == _revocation_generation:
+            return True
+        
+        generation = _revocation_generation
+        if not get_token_service().is_token_valid(jti):
+            return False
+        
+        if len(_refresh_validity_cache) >= REFRESH_VALIDITY_CACHE_MAX_ENTRIES:
+            _refresh_validity_cache.clear()
+        _refresh_validity_cache[jti] = (now + REFRESH_VALIDITY_TTL_SECONDS, generation)
+        return True
+    
+    @staticmethod
+    def _bump_revocation_generation():
+        """Invalidate all cached refresh-token validity checks."""
+        global _revocation_generation
+        _revocation_generation += 1
+    
     @staticmethod
     def refresh_access_token(refresh_token: str) -> dict:
         """
@@ -165,13 +287,22 @@ class JWTService:
         
         Raises:
             ValueError: If refresh token is invalid or revoked
+            PyMongoError: If the revocation state could not be read
         """
+        return _refresh_flight.do(
+            refresh_token, JWTService._refresh_access_token, refresh_token
+        )
+    
+    @staticmethod
+    def _refresh_access_token(refresh_token: str) -> dict:
+        """Verify the refresh token and issue a new access token."""
         # Verify refresh token
         payload = JWTService.verify_refresh_token(refresh_token)
         
-        # Get user from MongoDB
-        user_service = get_user_service()
-        user = user_service.find_user_by_email(payload['email'])
+        # Only the account status needs checking; identity claims come from
+        # the verified refresh payload. The cached lookup keeps deactivation
+        # effective within USER_CACHE_TTL_SECONDS without a round-trip per refresh.
+        user = get_user_service().find_user_by_email_cached(payload['email'])
         
         if not user:
             raise ValueError("User not found")
@@ -180,20 +311,21 @@ class JWTService:
             raise ValueError("User account is deactivated")
         
         # Generate new access token
-        now = timezone.now()
+        now = int(time.time())
         access_payload = {
-            'user_id': str(user['_id']),
-            'email': user['email'],
-            'name': user.get('name', ''),
-            'exp': now + JWTService.ACCESS_TOKEN_LIFETIME,
+            'user_id': payload['user_id'],
+            'email': payload['email'],
+            # Refresh tokens issued before 'name' was added fall back to the user
+            'name': payload['name'] if 'name' in payload else user.get('name', ''),
+            'exp': now + JWTService.ACCESS_TOKEN_LIFETIME_SECONDS,
             'iat': now,
             'token_type': 'access',
         }
-        access_token = jwt.encode(access_payload, settings.SECRET_KEY, algorithm='HS256')
+        access_token = encode_hs256(access_payload)
         
         return {
             'access': access_token,
-            'access_expires_in': int(JWTService.ACCESS_TOKEN_LIFETIME.total_seconds()),
+            'access_expires_in': JWTService.ACCESS_TOKEN_LIFETIME_SECONDS,
         }
     
     @staticmethod
@@ -207,8 +339,29 @@ class JWTService:
         Returns:
             bool: True if revoked successfully, False otherwise
         """
+        # Revoke by jti (unique index) rather than matching the whole token
+        # string. Expired tokens can still be revoked, forged ones cannot.
+        try:
+            payload = jwt.decode(
+                refresh_token,
+                settings.SECRET_KEY,
+                algorithms=['HS256'],
+                options={'verify_exp': False},
+            )
+        except jwt.InvalidTokenError as e:
+            logger.warning("Cannot revoke invalid refresh token: %s", e)
+            return False
+        
+        jti = payload.get('jti')
+        if not jti:
+            return False
+        
         token_service = get_token_service()
-        return token_service.revoke_token(refresh_token)
+        revoked = token_service.revoke_token_by_jti(jti)
+        # After the write: a concurrent check that read the token as active
+        # before it landed cached it under the old generation
+        JWTService._bump_revocation_generation()
+        return revoked
     
     @staticmethod
     def revoke_all_user_tokens(email: str) -> int:
@@ -222,7 +375,9 @@ class JWTService:
             int: Number of tokens revoked
         """
         token_service = get_token_service()
-        return token_service.revoke_all_user_tokens(email)
+        revoked_count = token_service.revoke_all_user_tokens(email)
+        JWTService._bump_revocation_generation()
+        return revoked_count
     
     @staticmethod
     def clean_expired_tokens() -> int:
@@ -244,26 +399,17 @@ class JWTService:
             response: HTTP response object
             tokens: Dictionary containing 'access' and 'refresh' tokens
         """
-        # Set access token cookie
         response.set_cookie(
-            key='access_token',
-            value=tokens['access'],
-            max_age=int(JWTService.ACCESS_TOKEN_LIFETIME.total_seconds()),
-            httponly=True,  # Prevents JavaScript access
-            secure=not settings.DEBUG,  # HTTPS only in production
-            samesite='Lax',  # CSRF protection
-            path='/',
+            'access_token',
+            tokens['access'],
+            max_age=JWTService.ACCESS_TOKEN_LIFETIME_SECONDS,
+            **JWTService.COOKIE_KWARGS,
         )
-        
-        # Set refresh token cookie
         response.set_cookie(
-            key='refresh_token',
-            value=tokens['refresh'],
-            max_age=int(JWTService.REFRESH_TOKEN_LIFETIME.total_seconds()),
-            httponly=True,  # Prevents JavaScript access
-            secure=not settings.DEBUG,  # HTTPS only in production
-            samesite='Lax',  # CSRF protection
-            path='/',
+            'refresh_token',
+            tokens['refresh'],
+            max_age=JWTService.REFRESH_TOKEN_LIFETIME_SECONDS,
+            **JWTService.COOKIE_KWARGS,
         )
     
     @staticmethod
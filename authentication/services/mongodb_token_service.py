@@ -5,39 +5,60 @@ This module handles JWT refresh token storage in MongoDB.
 """
 
 import os
+import hashlib
+import hmac
 import certifi
+from django.conf import settings
 from pymongo import MongoClient
-from pymongo.errors import ConnectionFailure, ServerSelectionTimeoutError
+from pymongo.read_concern import ReadConcern
+from pymongo.errors import (
+    ConnectionFailure,
+    ExecutionTimeout,
+    OperationFailure,
+    PyMongoError,
+    ServerSelectionTimeoutError,
+)
 from datetime import datetime, timedelta
 from typing import Optional, Dict, Any
 import logging
-import uuid
+import threading
 
 logger = logging.getLogger(__name__)
 
+# MongoDB error code for "index exists with different options"
+INDEX_OPTIONS_CONFLICT = 85
+
+# Server-side time limit for per-request token lookups, so a slow node
+# fails the query instead of pinning a worker
+HOT_QUERY_MAX_TIME_MS = 100
+
+
+def token_fingerprint(token: str) -> bytes:
+    """
+    Compute the 32-byte HMAC-SHA256 fingerprint stored in place of a token.
+    
+    Args:
+        token: The refresh token string
+    
+    Returns:
+        HMAC digest keyed with SECRET_KEY
+    """
+    return hmac.new(settings.SECRET_KEY.encode(), token.encode(), hashlib.sha256).digest()
+
 
 class MongoDBTokenService:
     """
     Service class for managing JWT refresh tokens in MongoDB.
     
     Tokens are stored in the 'refresh_tokens' collection.
+    Use get_token_service() to obtain the shared, connected instance.
     """
     
-    _instance = None
-    _client = None
-    _db = None
-    
     COLLECTION_NAME = 'refresh_tokens'
     
-    def __new__(cls):
-        if cls._instance is None:
-            cls._instance = super(MongoDBTokenService, cls).__new__(cls)
-        return cls._instance
-    
     def __init__(self):
-        if self._client is None:
-            self._connect()
-            self._ensure_indexes()
+        self._connect()
+        self._ensure_indexes()
     
     def _connect(self):
         """Establish MongoDB connection."""
@@ -48,12 +69,21 @@ class MongoDBTokenService:
             if not mongodb_uri:
                 raise ValueError("MONGODB_URI environment variable is not set")
             
+            # Refresh tokens can be recreated by logging in again, so
+            # primary-acknowledged writes are enough (no majority wait)
             self._client = MongoClient(
                 mongodb_uri, 
                 serverSelectionTimeoutMS=5000,
-                tlsCAFile=certifi.where()
+                tlsCAFile=certifi.where(),
+                w=1,
+                retryWrites=True,
+                maxPoolSize=100,
             )
             self._db = self._client[db_name]
+            self.collection = self._db[self.COLLECTION_NAME]
+            self._local_read_collection = self._db.get_collection(
+                self.COLLECTION_NAME, read_concern=ReadConcern('local')
+            )
             
             self._client.admin.command('ping')
             logger.info("MongoDB Token Service: Successfully connected to MongoDB")
@@ -68,7 +98,7 @@ class MongoDBTokenService:
     def _ensure_indexes(self):
         """Create necessary indexes on the refresh_tokens collection."""
         try:
-            collection = self._db[self.COLLECTION_NAME]
+            collection = self.collection
             
             # Index on jti for fast lookups
             collection.create_index('jti', unique=True)
@@ -76,8 +106,8 @@ class MongoDBTokenService:
             # Index on user_email for finding all user tokens
             collection.create_index('user_email')
             
-            # Index on expires_at for cleanup
-            collection.create_index('expires_at')
+            # TTL index on expires_at: MongoDB removes expired tokens itself
+            self._ensure_expiry_ttl_index(collection)
             
             # Compound index for token validation
             collection.create_index([('jti', 1), ('is_revoked', 1)])
@@ -87,12 +117,22 @@ class MongoDBTokenService:
         except Exception as e:
             logger.error(f"MongoDB Token Service: Error creating indexes: {str(e)}")
     
-    @property
-    def collection(self):
-        """Get the refresh_tokens collection."""
-        if self._db is None:
-            self._connect()
-        return self._db[self.COLLECTION_NAME]
+    def _ensure_expiry_ttl_index(self, collection):
+        """
+        Create the expires_at TTL index, converting the plain expires_at
+        index created by earlier versions in place.
+        """
+        try:
+            collection.create_index('expires_at', expireAfterSeconds=0)
+        except OperationFailure as e:
+            if e.code != INDEX_OPTIONS_CONFLICT:
+                raise
+            self._db.command(
+                'collMod',
+                self.COLLECTION_NAME,
+                index={'keyPattern': {'expires_at': 1}, 'expireAfterSeconds': 0},
+            )
+            logger.info("MongoDB Token Service: Converted expires_at index to TTL")
     
     def store_refresh_token(
         self,
@@ -106,9 +146,12 @@ class MongoDBTokenService:
         """
         Store a new refresh token.
         
+        Only the jti and an HMAC-SHA256 fingerprint of the token are stored;
+        the token string itself is never persisted.
+        
         Args:
             user_email: User's email address
-            token: The refresh token string
+            token: The refresh token string (used for the fingerprint only)
             jti: JWT ID for token identification
             expires_at: Token expiration datetime
             ip_address: Client IP address (optional)
@@ -120,7 +163,7 @@ class MongoDBTokenService:
         try:
             token_doc = {
                 'user_email': user_email.lower(),
-                'token': token,
+                'token_hash': token_fingerprint(token),
                 'jti': jti,
                 'created_at': datetime.utcnow(),
                 'expires_at': expires_at,
@@ -151,72 +194,45 @@ class MongoDBTokenService:
             Token document or None
         """
         try:
-            return self.collection.find_one({'jti': jti})
+            return self._local_read_collection.find_one(
+                {'jti': jti}, max_time_ms=HOT_QUERY_MAX_TIME_MS
+            )
         except Exception as e:
             logger.error(f"Error finding token by JTI: {str(e)}")
             return None
     
-    def find_token(self, token: str) -> Optional[Dict[str, Any]]:
-        """
-        Find a refresh token by token string.
-        
-        Args:
-            token: The refresh token string
-        
-        Returns:
-            Token document or None
-        """
-        try:
-            return self.collection.find_one({'token': token})
-        except Exception as e:
-            logger.error(f"Error finding token: {str(e)}")
-            return None
-    
     def is_token_valid(self, jti: str) -> bool:
         """
-        Check if a token is valid (exists, not revoked, not expired).
+        Check if a token is valid (exists and not revoked).
+        
+        Expiry is not re-checked here: callers pass the jti of a token whose
+        'exp' claim jwt.decode has already enforced, and the TTL index
+        removes expired documents.
         
         Args:
             jti: JWT ID
         
         Returns:
-            True if token is valid, False otherwise
-        """
-        try:
-            token = self.collection.find_one({
-                'jti': jti,
-                'is_revoked': False,
-                'expires_at': {'$gt': datetime.utcnow()}
-            })
-            return token is not None
-        except Exception as e:
-            logger.error(f"Error checking token validity: {str(e)}")
-            return False
-    
-    def revoke_token(self, token: str) -> bool:
-        """
-        Revoke a refresh token.
+            True if token is valid, False if no unrevoked token has this jti
         
-        Args:
-            token: The refresh token string
-        
-        Returns:
-            True if revoked successfully, False otherwise
+        Raises:
+            PyMongoError: If the lookup failed or exceeded HOT_QUERY_MAX_TIME_MS;
+                the token's state is unknown, so it is not reported as revoked
         """
         try:
-            result = self.collection.update_one(
-                {'token': token},
-                {
-                    '$set': {
-                        'is_revoked': True,
-                        'revoked_at': datetime.utcnow()
-                    }
-                }
+            # Answered from the (jti, is_revoked) index; only _id comes back
+            token = self._local_read_collection.find_one(
+                {'jti': jti, 'is_revoked': False},
+                projection={'_id': 1},
+                max_time_ms=HOT_QUERY_MAX_TIME_MS
             )
-            return result.modified_count > 0
-        except Exception as e:
-            logger.error(f"Error revoking token: {str(e)}")
-            return False
+            return token is not None
+        except ExecutionTimeout:
+            logger.warning(f"Token validity check exceeded {HOT_QUERY_MAX_TIME_MS}ms")
+            raise
+        except PyMongoError as e:
+            logger.error(f"Error checking token validity: {str(e)}")
+            raise
     
     def revoke_token_by_jti(self, jti: str) -> bool:
         """
@@ -273,6 +289,10 @@ class MongoDBTokenService:
         """
         Delete expired tokens from the database.
         
+        The expires_at TTL index already removes expired tokens in the
+        background (MongoDB's TTL monitor runs about once a minute), so this
+        is only needed for an immediate, on-demand purge.
+        
         Returns:
             Number of tokens deleted
         """
@@ -287,7 +307,23 @@ class MongoDBTokenService:
             return 0
 
 
+_token_service: Optional[MongoDBTokenService] = None
+_token_service_lock = threading.Lock()
+
+
+def _build_token_service() -> MongoDBTokenService:
+    """Create the shared service once, even if several threads race here."""
+    global _token_service
+    with _token_service_lock:
+        if _token_service is None:
+            _token_service = MongoDBTokenService()
+        return _token_service
+
+
 # Singleton instance getter
 def get_token_service() -> MongoDBTokenService:
     """Get the MongoDB Token Service instance."""
-    return MongoDBTokenService()
+    service = _token_service
+    if service is None:
+        service = _build_token_service()
+    return service
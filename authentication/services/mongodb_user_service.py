@@ -7,14 +7,76 @@ Users are stored in the 'users' collection.
 
 import os
 import certifi
-from pymongo import MongoClient
+from bson import ObjectId
+from pymongo import IndexModel, MongoClient, ReturnDocument, WriteConcern
+from pymongo.database import Database
 from pymongo.errors import ConnectionFailure, ServerSelectionTimeoutError, DuplicateKeyError
 from datetime import datetime
-from typing import Optional, Dict, Any
+from functools import lru_cache, wraps
+from typing import Optional, Dict, Any, Tuple
 import logging
+import threading
+import time
 
 logger = logging.getLogger(__name__)
 
+# Per-request authentication looks the user up by email on every request;
+# keep recently fetched documents for a short window to skip the round-trip.
+USER_CACHE_TTL_SECONDS = 30
+USER_CACHE_MAX_ENTRIES = 10000
+
+# Fields needed to build an authenticated request user (MongoUser) and to
+# answer /api/auth/me/
+AUTH_USER_PROJECTION = {
+    '_id': 1,
+    'email': 1,
+    'name': 1,
+    'first_name': 1,
+    'last_name': 1,
+    'profile_picture': 1,
+    'is_active': 1,
+    'auth_provider': 1,
+    'created_at': 1,
+    'last_login': 1,
+}
+
+@lru_cache(maxsize=1024)
+def _object_id(user_id: str) -> ObjectId:
+    """Parse a hex user id once; repeated lookups reuse the ObjectId."""
+    return ObjectId(user_id)
+
+
+def _safe_mongo(message: str, default: Any = None):
+    """
+    Log and swallow errors from a read-only lookup, returning `default`.
+    
+    Args:
+        message: Log message prefix identifying the operation
+        default: Value returned when the operation raises
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            try:
+                return func(*args, **kwargs)
+            except Exception as e:
+                logger.error("%s: %s", message, e)
+                return default
+        return wrapper
+    return decorator
+
+
+# Write concern for advisory fields (last_login) that need no acknowledgement
+UNACKNOWLEDGED = WriteConcern(w=0)
+
+# Indexes on the users collection, created in one createIndexes command
+USER_INDEXES = [
+    # Unique index on email
+    IndexModel('email', unique=True),
+    # Index on google_id for faster lookups
+    IndexModel('google_id', unique=True, sparse=True),
+]
+
 
 class MongoDBUserService:
     """
@@ -24,24 +86,36 @@ class MongoDBUserService:
     Users are stored in the 'users' collection.
     """
     
-    _instance = None
-    _client = None
-    _db = None
+    # One client per process: a MongoClient inherited across fork() reuses
+    # the parent's sockets, so each worker connects on first use instead.
+    _clients: Dict[int, MongoClient] = {}
+    _dbs: Dict[int, Database] = {}
+    _connect_lock = threading.Lock()
     
-    COLLECTION_NAME = 'users'
+    # email -> (expires_at monotonic seconds, user document)
+    _user_cache: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+    _user_cache_lock = threading.Lock()
+    
+    # PIDs that have already ensured indexes (forked workers inherit this)
+    _indexes_ensured = set()
     
-    def __new__(cls):
-        if cls._instance is None:
-            cls._instance = super(MongoDBUserService, cls).__new__(cls)
-        return cls._instance
+    COLLECTION_NAME = 'users'
     
     def __init__(self):
-        if self._client is None:
+        if os.getpid() not in self._dbs:
             self._connect()
-            self._ensure_indexes()
     
     def _connect(self):
-        """Establish MongoDB connection."""
+        """Establish this process's MongoDB connection (once per PID)."""
+        pid = os.getpid()
+        with self._connect_lock:
+            if pid in self._dbs:
+                return
+            self._dbs[pid] = self._create_database()
+        self._ensure_indexes()
+    
+    def _create_database(self) -> Database:
+        """Create a MongoClient and return its configured database."""
         try:
             mongodb_uri = os.environ.get('MONGODB_URI')
             db_name = os.environ.get('MONGODB_DB_NAME', 'github_bot_db')
@@ -50,64 +124,129 @@ class MongoDBUserService:
                 raise ValueError("MONGODB_URI environment variable is not set")
             
             # Use certifi for SSL certificate verification
-            self._client = MongoClient(
+            client = MongoClient(
                 mongodb_uri, 
                 serverSelectionTimeoutMS=5000,
-                tlsCAFile=certifi.where()
+                tlsCAFile=certifi.where(),
+                maxPoolSize=50,
+                minPoolSize=5,
             )
-            self._db = self._client[db_name]
             
             # Test connection
-            self._client.admin.command('ping')
+            client.admin.command('ping')
+            self._clients[os.getpid()] = client
             logger.info("MongoDB User Service: Successfully connected to MongoDB")
             
+            return client[db_name]
+            
         except (ConnectionFailure, ServerSelectionTimeoutError) as e:
-            logger.error(f"MongoDB User Service: Failed to connect to MongoDB: {str(e)}")
+            logger.error("MongoDB User Service: Failed to connect to MongoDB: %s", e)
             raise
         except Exception as e:
-            logger.error(f"MongoDB User Service: Unexpected error connecting to MongoDB: {str(e)}")
+            logger.error("MongoDB User Service: Unexpected error connecting to MongoDB: %s", e)
             raise
     
     def _ensure_indexes(self):
         """Create necessary indexes on the users collection."""
+        pid = os.getpid()
+        if pid in self._indexes_ensured:
+            return
+        
         try:
-            collection = self._db[self.COLLECTION_NAME]
-            
-            # Create unique index on email
-            collection.create_index('email', unique=True)
-            
-            # Create index on google_id for faster lookups
-            collection.create_index('google_id', unique=True, sparse=True)
+            self.collection.create_indexes(USER_INDEXES)
+            self._indexes_ensured.add(pid)
             
             logger.info("MongoDB User Service: Indexes created successfully")
             
         except Exception as e:
-            logger.error(f"MongoDB User Service: Error creating indexes: {str(e)}")
+            logger.error("MongoDB User Service: Error creating indexes: %s", e)
     
     @property
     def collection(self):
-        """Get the users collection."""
-        if self._db is None:
+        """Get the users collection for the current process."""
+        db = self._dbs.get(os.getpid())
+        if db is None:
             self._connect()
-        return self._db[self.COLLECTION_NAME]
+            db = self._dbs[os.getpid()]
+        return db[self.COLLECTION_NAME]
     
-    def find_user_by_email(self, email: str) -> Optional[Dict[str, Any]]:
+    @_safe_mongo("Error finding user by email")
+    def find_user_by_email(
+        self,
+        email: str,
+        projection: Optional[Dict[str, int]] = None
+    ) -> Optional[Dict[str, Any]]:
         """
         Find a user by email address.
         
         Args:
             email: User's email address (case-insensitive)
+            projection: Optional MongoDB projection to limit returned fields
         
         Returns:
             User document or None if not found
         """
-        try:
-            user = self.collection.find_one({'email': email.lower()})
-            return user
-        except Exception as e:
-            logger.error(f"Error finding user by email: {str(e)}")
-            return None
+        return self.collection.find_one({'email': email.lower()}, projection)
+    
+    def find_user_by_email_cached(self, email: str) -> Optional[Dict[str, Any]]:
+        """
+        Find a user by email, serving recent lookups from an in-process cache.
+        
+        Intended for the authentication hot path, where the email comes from a
+        verified JWT. Only AUTH_USER_PROJECTION fields are fetched. Misses are
+        not cached so new accounts are visible at once.
+        
+        Args:
+            email: User's email address (case-insensitive)
+        
+        Returns:
+            User document or None if not found
+        """
+        key = email.lower()
+        now = time.monotonic()
+        
+        entry = self._user_cache.get(key)
+        if entry is not None and entry[0] > now:
+            return entry[1]
+        
+        user = self.find_user_by_email(key, projection=AUTH_USER_PROJECTION)
+        if user is not None:
+            self._cache_user(key, user, now)
+        return user
+    
+    def _cache_user(self, key: str, user: Dict[str, Any], now: Optional[float] = None) -> None:
+        """Store an AUTH_USER_PROJECTION document under its lowercased email."""
+        if now is None:
+            now = time.monotonic()
+        with self._user_cache_lock:
+            if len(self._user_cache) >= USER_CACHE_MAX_ENTRIES:
+                self._evict_expired_users(now)
+            self._user_cache[key] = (now + USER_CACHE_TTL_SECONDS, user)
+    
+    def invalidate_cached_user(self, email: str) -> None:
+        """
+        Drop a user from the lookup cache after it has been modified.
+        
+        Args:
+            email: User's email address
+        """
+        with self._user_cache_lock:
+            self._user_cache.pop(email.lower(), None)
+    
+    def _evict_expired_users(self, now: float) -> None:
+        """
+        Remove expired cache entries, or everything if all are still live.
+        
+        Must be called with _user_cache_lock held, so no other thread
+        resizes the dict while it is being scanned.
+        """
+        cache = self._user_cache
+        for key in [key for key, (expires_at, _) in cache.items() if expires_at <= now]:
+            del cache[key]
+        if len(cache) >= USER_CACHE_MAX_ENTRIES:
+            cache.clear()
     
+    @_safe_mongo("Error finding user by Google ID")
     def find_user_by_google_id(self, google_id: str) -> Optional[Dict[str, Any]]:
         """
         Find a user by Google ID.
@@ -118,31 +257,27 @@ class MongoDBUserService:
         Returns:
             User document or None if not found
         """
-        try:
-            user = self.collection.find_one({'google_id': google_id})
-            return user
-        except Exception as e:
-            logger.error(f"Error finding user by Google ID: {str(e)}")
-            return None
+        return self.collection.find_one({'google_id': google_id})
     
-    def find_user_by_id(self, user_id: str) -> Optional[Dict[str, Any]]:
+    @_safe_mongo("Error finding user by ID")
+    def find_user_by_id(
+        self,
+        user_id: str,
+        projection: Optional[Dict[str, int]] = None
+    ) -> Optional[Dict[str, Any]]:
         """
         Find a user by MongoDB _id.
         
         Args:
             user_id: MongoDB document ID as string
+            projection: Optional MongoDB projection to limit returned fields
         
         Returns:
             User document or None if not found
         """
-        try:
-            from bson import ObjectId
-            user = self.collection.find_one({'_id': ObjectId(user_id)})
-            return user
-        except Exception as e:
-            logger.error(f"Error finding user by ID: {str(e)}")
-            return None
+        return self.collection.find_one({'_id': _object_id(user_id)}, projection)
     
+    @_safe_mongo("Error checking if user exists", default=False)
     def user_exists(self, email: str) -> bool:
         """
         Check if a user exists by email.
@@ -153,7 +288,8 @@ class MongoDBUserService:
         Returns:
             True if user exists, False otherwise
         """
-        return self.find_user_by_email(email) is not None
+        # Bounded count on the unique email index: no document is fetched
+        return self.collection.count_documents({'email': email.lower()}, limit=1) > 0
     
     def create_user(self, user_info: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -175,60 +311,119 @@ class MongoDBUserService:
             DuplicateKeyError: If user with email already exists
         """
         try:
-            now = datetime.utcnow()
-            
-            user_doc = {
-                'email': user_info['email'].lower(),
-                'name': user_info.get('name', ''),
-                'first_name': user_info.get('first_name', ''),
-                'last_name': user_info.get('last_name', ''),
-                'google_id': user_info.get('google_id'),
-                'profile_picture': user_info.get('profile_picture', ''),
-                'auth_provider': 'google',
-                'is_active': True,
-                'is_email_verified': user_info.get('email_verified', True),
-                'created_at': now,
-                'updated_at': now,
-                'last_login': now,
-            }
+            user_doc = self._build_user_doc(user_info, datetime.utcnow())
             
             result = self.collection.insert_one(user_doc)
             user_doc['_id'] = result.inserted_id
+            self.invalidate_cached_user(user_doc['email'])
             
-            logger.info(f"MongoDB User Service: Created new user with email: {user_doc['email']}")
+            logger.info("MongoDB User Service: Created new user with email: %s", user_doc['email'])
             return user_doc
             
         except DuplicateKeyError:
-            logger.warning(f"MongoDB User Service: User with email {user_info['email']} already exists")
+            logger.warning("MongoDB User Service: User with email %s already exists", user_info['email'])
             raise
         except Exception as e:
-            logger.error(f"MongoDB User Service: Error creating user: {str(e)}")
+            logger.error("MongoDB User Service: Error creating user: %s", e)
             raise
     
+    def get_or_create_user(self, user_info: Dict[str, Any]) -> Tuple[Dict[str, Any], bool]:
+        """
+        Log in the user with this email, creating the account if needed.
+        
+        A single upserting find_one_and_update either inserts the new
+        document or stamps last_login on the existing one, so there is no
+        separate existence check and no window for a duplicate insert.
+        
+        Args:
+            user_info: User information from Google OAuth (see create_user)
+        
+        Returns:
+            Tuple of (user document, True if it was created)
+        """
+        try:
+            user_doc = self._build_user_doc(user_info, datetime.utcnow())
+            # Pre-assign the id so the inserted document is known without a read
+            user_doc['_id'] = ObjectId()
+            
+            # Timestamps set by $currentDate can't also appear in $setOnInsert
+            insert_fields = {
+                key: value for key, value in user_doc.items()
+                if key not in ('last_login', 'updated_at')
+            }
+            existing = self.collection.find_one_and_update(
+                {'email': user_doc['email']},
+                {
+                    '$setOnInsert': insert_fields,
+                    '$currentDate': {'last_login': True, 'updated_at': True},
+                },
+                projection=AUTH_USER_PROJECTION,
+                upsert=True,
+                return_document=ReturnDocument.BEFORE
+            )
+            self.invalidate_cached_user(user_doc['email'])
+            
+            if existing is None:
+                logger.info("MongoDB User Service: Created new user with email: %s", user_doc['email'])
+                return user_doc, True
+            return existing, False
+            
+        except Exception as e:
+            logger.error("MongoDB User Service: Error creating user: %s", e)
+            raise
+    
+    @staticmethod
+    def _build_user_doc(user_info: Dict[str, Any], now: datetime) -> Dict[str, Any]:
+        """Build a new user document from Google SSO user info."""
+        return {
+            'email': user_info['email'].lower(),
+            'name': user_info.get('name', ''),
+            'first_name': user_info.get('first_name', ''),
+            'last_name': user_info.get('last_name', ''),
+            'google_id': user_info.get('google_id'),
+            'profile_picture': user_info.get('profile_picture', ''),
+            'auth_provider': 'google',
+            'is_active': True,
+            'is_email_verified': user_info.get('email_verified', True),
+            'created_at': now,
+            'updated_at': now,
+            'last_login': now,
+        }
+    
     def update_user_login(self, email: str) -> Optional[Dict[str, Any]]:
         """
         Update user's last login timestamp.
         
+        The user is resolved through the lookup cache, and last_login is
+        written with w=0 (fire-and-forget): it is advisory metadata, so a
+        lost write on a server failure is acceptable in exchange for not
+        waiting on the acknowledgement. Write errors are therefore not
+        reported.
+        
         Args:
             email: User's email address
         
         Returns:
-            Updated user document or None
+            User document (projected) or None if the user doesn't exist
         """
         try:
-            result = self.collection.find_one_and_update(
-                {'email': email.lower()},
-                {
-                    '$set': {
-                        'last_login': datetime.utcnow(),
-                        'updated_at': datetime.utcnow()
-                    }
-                },
-                return_document=True
+            key = email.lower()
+            user = self.find_user_by_email_cached(key)
+            if user is None:
+                return None
+            
+            self.collection.with_options(write_concern=UNACKNOWLEDGED).update_one(
+                {'_id': user['_id']},
+                {'$currentDate': {'last_login': True, 'updated_at': True}}
             )
-            return result
+            
+            # Keep the cached copy in step with the write just issued
+            now = datetime.utcnow()
+            user = {**user, 'last_login': now, 'updated_at': now}
+            self._cache_user(key, user)
+            return user
         except Exception as e:
-            logger.error(f"MongoDB User Service: Error updating user login: {str(e)}")
+            logger.error("MongoDB User Service: Error updating user login: %s", e)
             return None
     
     def update_user(self, email: str, update_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
@@ -243,16 +438,18 @@ class MongoDBUserService:
             Updated user document or None
         """
         try:
-            update_data['updated_at'] = datetime.utcnow()
+            key = email.lower()
             
+            # updated_at is stamped by the server
             result = self.collection.find_one_and_update(
-                {'email': email.lower()},
-                {'$set': update_data},
-                return_document=True
+                {'email': key},
+                {'$set': update_data, '$currentDate': {'updated_at': True}},
+                return_document=ReturnDocument.AFTER
             )
+            self.invalidate_cached_user(key)
             return result
         except Exception as e:
-            logger.error(f"MongoDB User Service: Error updating user: {str(e)}")
+            logger.error("MongoDB User Service: Error updating user: %s", e)
             return None
 
 
@@ -0,0 +1,58 @@
+"""
+Single-Flight Helper
+
+This module collapses concurrent calls that share a key into one execution.
+Used on the token paths where duplicate requests (double-submitted OAuth
+callbacks, parallel refreshes from several tabs) would otherwise each hit
+Google or MongoDB.
+"""
+
+from concurrent.futures import Future
+import threading
+
+
+class SingleFlight:
+    """
+    Run at most one call per key at a time.
+
+    The first caller for a key executes the function; callers arriving while
+    it runs wait for and share its result (or exception). Nothing is cached
+    once the call completes.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._inflight = {}
+
+    def do(self, key, fn, *args, **kwargs):
+        """
+        Execute fn(*args, **kwargs), or join an in-flight call for the same key.
+
+        Args:
+            key: Hashable key identifying equivalent calls
+            fn: Function to execute
+
+        Returns:
+            The function's result
+        """
+        with self._lock:
+            future = self._inflight.get(key)
+            is_owner = future is None
+            if is_owner:
+                future = Future()
+                self._inflight[key] = future
+
+        if not is_owner:
+            return future.result()
+
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
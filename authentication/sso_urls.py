@@ -0,0 +1,15 @@
+"""
+Authentication SSO URL Configuration
+
+Defines URL patterns for SSO provider callbacks.
+"""
+
+from django.urls import path
+from authentication.web_views import GoogleCallbackView
+
+app_name = 'authentication'
+
+urlpatterns = [
+    # Google OAuth redirect URI (GOOGLE_OAUTH_REDIRECT_URI)
+    path('google/callback/', GoogleCallbackView.as_view(), name='google-callback'),
+]
@@ -1,3 +1,207 @@
-from django.test import TestCase
+import json
+import threading
+import time
+import uuid
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+import jwt
+from django.conf import settings
+from django.contrib.admin.sites import AdminSite
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase
+from django.utils import timezone
+from pymongo.errors import ExecutionTimeout
+
+from authentication.admin import RefreshTokenAdmin
+from authentication.login_required_middleware import LoginRequiredMiddleware
+from authentication.middleware import ANONYMOUS_USER
+from authentication.models import RefreshToken, User
+from authentication.services import GoogleOAuthService, JWTService
+from authentication.services.jwt_service import encode_hs256
+from authentication.services.mongodb_token_service import MongoDBTokenService
+from authentication.views import RefreshTokenView
+from authentication.services.single_flight import SingleFlight
+
+
+class LoginRequiredMiddlewareTests(SimpleTestCase):
+    def setUp(self):
+        self.middleware = LoginRequiredMiddleware(lambda request: HttpResponse())
+
+    def test_exempt_paths(self):
+        self.assertTrue(self.middleware.is_exempt('/auth/login/'))
+        self.assertTrue(self.middleware.is_exempt('/api/jwt/sign/'))
+        self.assertTrue(self.middleware.is_exempt('/admin/login/'))
+        self.assertTrue(self.middleware.is_exempt('/static/css/app.css'))
+
+    def test_protected_paths(self):
+        self.assertFalse(self.middleware.is_exempt('/'))
+        self.assertFalse(self.middleware.is_exempt('/api/chat/'))
+        self.assertFalse(self.middleware.is_exempt('/api/auth/api/me/'))
+
+    def test_is_api_request(self):
+        factory = RequestFactory()
+        self.assertTrue(self.middleware.is_api_request(factory.get('/api/chat/')))
+        self.assertTrue(self.middleware.is_api_request(
+            factory.get('/', HTTP_ACCEPT='application/json, text/plain, */*')
+        ))
+        self.assertTrue(self.middleware.is_api_request(
+            factory.post('/', data='{}', content_type='application/json; charset=utf-8')
+        ))
+        self.assertFalse(self.middleware.is_api_request(
+            factory.get('/', HTTP_ACCEPT='text/html,application/xhtml+xml,*/*;q=0.8')
+        ))
+
+    def test_unauthenticated_responses(self):
+        factory = RequestFactory()
+
+        request = factory.get('/api/chat/')
+        request.user = ANONYMOUS_USER
+        response = self.middleware(request)
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertEqual(json.loads(response.content)['code'], 'UNAUTHORIZED')
+
+        request = factory.get('/code-review/')
+        request.user = ANONYMOUS_USER
+        response = self.middleware(request)
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(response['Location'], '/auth/login/?next=/code-review/')
+
+
+class JWTServiceAccessTokenTests(SimpleTestCase):
+    def _encode(self, lifetime_seconds, token_type='access'):
+        now = int(time.time())
+        payload = {
+            'email': 'user@example.com',
+            'exp': now + lifetime_seconds,
+            'iat': now,
+            'token_type': token_type,
+        }
+        return jwt.encode(payload, settings.SECRET_KEY, algorithm='HS256')
+
+    def test_verify_access_token_is_cached(self):
+        token = self._encode(60)
+        first = JWTService.verify_access_token(token)
+        self.assertEqual(first['email'], 'user@example.com')
+        self.assertIs(JWTService.verify_access_token(token), first)
+
+    def test_verify_rejects_expired_and_wrong_type(self):
+        with self.assertRaises(ValueError):
+            JWTService.verify_access_token(self._encode(-60))
+        with self.assertRaises(ValueError):
+            JWTService.verify_access_token(self._encode(60, token_type='refresh'))
+
+    def test_encode_hs256_matches_pyjwt(self):
+        now = int(time.time())
+        payload = {'email': 'user@example.com', 'exp': now + 300, 'iat': now}
+        token = encode_hs256(payload)
+        self.assertEqual(token, jwt.encode(payload, settings.SECRET_KEY, algorithm='HS256'))
+        decoded = jwt.decode(token, settings.SECRET_KEY, algorithms=['HS256'])
+        self.assertEqual(decoded['email'], 'user@example.com')
+
+
+class RefreshTokenValidityTests(SimpleTestCase):
+    def setUp(self):
+        # Skip __init__, which connects to MongoDB
+        self.token_service = MongoDBTokenService.__new__(MongoDBTokenService)
+        self.token_service._local_read_collection = mock.Mock()
+        self.find_one = self.token_service._local_read_collection.find_one
+
+    def _refresh_token(self):
+        now = int(time.time())
+        payload = {
+            'email': 'user@example.com',
+            'jti': uuid.uuid4().hex,
+            'exp': now + 60,
+            'iat': now,
+            'token_type': 'refresh',
+        }
+        return encode_hs256(payload)
+
+    def test_missing_token_is_invalid(self):
+        self.find_one.return_value = None
+        self.assertFalse(self.token_service.is_token_valid('abc'))
+        self.find_one.return_value = {'_id': 1}
+        self.assertTrue(self.token_service.is_token_valid('abc'))
+
+    def test_timeout_is_raised_not_reported_as_revoked(self):
+        self.find_one.side_effect = ExecutionTimeout('operation exceeded time limit')
+        with mock.patch(
+            'authentication.services.jwt_service.get_token_service',
+            return_value=self.token_service,
+        ), self.assertLogs('authentication.services.mongodb_token_service', 'WARNING'):
+            with self.assertRaises(ExecutionTimeout):
+                JWTService.verify_refresh_token(self._refresh_token())
+
+    def test_refresh_view_returns_503_on_timeout(self):
+        request = RequestFactory().post('/api/auth/refresh/')
+        request.COOKIES['refresh_token'] = self._refresh_token()
+        with mock.patch.object(
+            JWTService, 'refresh_access_token',
+            side_effect=ExecutionTimeout('operation exceeded time limit'),
+        ), self.assertLogs('authentication.views', 'ERROR'):
+            response = RefreshTokenView.as_view()(request)
+        self.assertEqual(response.status_code, 503)
+
+
+class RefreshTokenAdminTests(TestCase):
+    def test_queryset_annotates_expiry(self):
+        user = User.objects.create(username='user', email='user@example.com')
+        now = timezone.now()
+        RefreshToken.objects.create(
+            user=user, token='expired', jti='expired', expires_at=now - timedelta(days=1)
+        )
+        RefreshToken.objects.create(
+            user=user, token='live', jti='live', expires_at=now + timedelta(days=1)
+        )
+
+        model_admin = RefreshTokenAdmin(RefreshToken, AdminSite())
+        tokens = {t.jti: t for t in model_admin.get_queryset(RequestFactory().get('/'))}
+
+        self.assertTrue(model_admin.expired(tokens['expired']))
+        self.assertFalse(model_admin.expired(tokens['live']))
+        self.assertTrue(tokens['live'].is_valid)
+
+
+class SingleFlightTests(SimpleTestCase):
+    def test_concurrent_calls_share_one_execution(self):
+        flight = SingleFlight()
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+
+        def work():
+            calls.append(1)
+            started.set()
+            release.wait(timeout=5)
+            return 'result'
+
+        results = []
+        owner = threading.Thread(target=lambda: results.append(flight.do('key', work)))
+        owner.start()
+        started.wait(timeout=5)
+        waiter = threading.Thread(target=lambda: results.append(flight.do('key', work)))
+        waiter.start()
+        time.sleep(0.05)
+        release.set()
+        owner.join()
+        waiter.join()
+
+        self.assertEqual(calls, [1])
+        self.assertEqual(results, ['result', 'result'])
+        self.assertEqual(flight.do('key', lambda: 'again'), 'again')
+
+
+class GoogleAuthorizationUrlTests(SimpleTestCase):
+    def test_state_is_fresh_per_url(self):
+        redirect_uri = 'https://example.com/auth/google/callback/'
+        first = GoogleOAuthService.get_authorization_url(redirect_uri)
+        second = GoogleOAuthService.get_authorization_url(redirect_uri)
+
+        self.assertNotEqual(first, second)
+        self.assertEqual(first.rpartition('&state=')[0], second.rpartition('&state=')[0])
+        self.assertIn('redirect_uri=https%3A%2F%2Fexample.com%2Fauth%2Fgoogle%2Fcallback%2F', first)
+        self.assertTrue(
+            GoogleOAuthService.get_authorization_url(redirect_uri, state='abc').endswith('&state=abc')
+        )
@@ -1,8 +1,11 @@
 """
 Authentication URL Configuration
 
-This module defines URL patterns for Google SSO authentication endpoints.
+This module defines URL patterns for Google SSO authentication API endpoints.
 Google SSO is the ONLY authentication method.
+
+Web pages live in authentication/web_urls.py and the SSO callback in
+authentication/sso_urls.py, so each prefix only carries its own routes.
 """
 
 from django.urls import path
@@ -15,10 +18,6 @@ from authentication.views import (
     MeView,
     RevokeAllTokensView,
 )
-from authentication.web_views import (
-    LoginView,
-    GoogleCallbackView,
-)
 
 app_name = 'authentication'
 
@@ -31,8 +30,4 @@ urlpatterns = [
     path('api/refresh/', RefreshTokenView.as_view(), name='api-refresh'),
     path('api/me/', MeView.as_view(), name='api-me'),
     path('api/revoke-all/', RevokeAllTokensView.as_view(), name='api-revoke-all'),
-    
-    # Web pages
-    path('login/', LoginView.as_view(), name='login'),
-    path('google/callback/', GoogleCallbackView.as_view(), name='google-callback'),
 ]
@@ -16,10 +16,26 @@ from authentication.services import (
     TokenCookieAuthentication,
     get_user_service,
 )
+from pymongo.errors import PyMongoError
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Settings are fixed once the views are imported; read the default once
+DEFAULT_REDIRECT_URI = settings.GOOGLE_OAUTH_REDIRECT_URI
+
+
+def _serialize_user(user: dict) -> dict:
+    """Public user fields returned by the auth endpoints."""
+    return {
+        'id': str(user['_id']),
+        'email': user['email'],
+        'name': user.get('name', ''),
+        'first_name': user.get('first_name', ''),
+        'last_name': user.get('last_name', ''),
+        'profile_picture': user.get('profile_picture', ''),
+    }
+
 
 class GoogleLoginInitView(APIView):
     """
@@ -38,7 +54,7 @@ class GoogleLoginInitView(APIView):
             200: Authorization URL
         """
         try:
-            redirect_uri = settings.GOOGLE_OAUTH_REDIRECT_URI
+            redirect_uri = DEFAULT_REDIRECT_URI
             auth_url = GoogleOAuthService.get_authorization_url(redirect_uri)
             
             return Response(
@@ -47,7 +63,7 @@ class GoogleLoginInitView(APIView):
             )
             
         except Exception as e:
-            logger.error(f"Failed to generate Google auth URL: {str(e)}", exc_info=True)
+            logger.error("Failed to generate Google auth URL: %s", e, exc_info=True)
             return Response(
                 {'error': 'Failed to initialize Google login'},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
@@ -62,7 +78,7 @@ class GoogleAuthView(APIView):
     
     This endpoint handles the complete authentication flow:
     1. Exchanges the Google auth code for user info
-    2. Checks if user exists in MongoDB
+    2. Logs in the user if they exist in MongoDB (single round-trip)
     3. Returns appropriate response based on user existence
     
     For existing users: Logs them in and returns tokens
@@ -88,7 +104,7 @@ class GoogleAuthView(APIView):
             401: Authentication failed
         """
         code = request.data.get('code')
-        redirect_uri = request.data.get('redirect_uri', settings.GOOGLE_OAUTH_REDIRECT_URI)
+        redirect_uri = request.data.get('redirect_uri', DEFAULT_REDIRECT_URI)
         confirm_signup = request.data.get('confirm_signup', False)
         
         if not code:
@@ -102,13 +118,10 @@ class GoogleAuthView(APIView):
             user_info = GoogleOAuthService.get_user_info_from_code(code, redirect_uri)
             email = user_info['email']
             
-            # Check if user exists
-            user_exists = GoogleOAuthService.check_user_exists(email)
+            # Log the user in if they exist (one round-trip for check + update)
+            user = GoogleOAuthService.login_if_exists(email)
             
-            if user_exists:
-                # Existing user - log them in
-                user = GoogleOAuthService.authenticate_existing_user(email)
-                
+            if user is not None:
                 # Generate JWT tokens
                 tokens = JWTService.generate_tokens(user, request)
                 
@@ -116,14 +129,7 @@ class GoogleAuthView(APIView):
                 response_data = {
                     'message': 'Login successful',
                     'user_exists': True,
-                    'user': {
-                        'id': str(user['_id']),
-                        'email': user['email'],
-                        'name': user.get('name', ''),
-                        'first_name': user.get('first_name', ''),
-                        'last_name': user.get('last_name', ''),
-                        'profile_picture': user.get('profile_picture', ''),
-                    },
+                    'user': _serialize_user(user),
                 }
                 
                 response = Response(response_data, status=status.HTTP_200_OK)
@@ -131,7 +137,7 @@ class GoogleAuthView(APIView):
                 # Set tokens in secure httpOnly cookies
                 JWTService.set_tokens_in_cookies(response, tokens)
                 
-                logger.info(f"User logged in via Google: {email}")
+                logger.info("User logged in via Google: %s", email)
                 return response
             
             else:
@@ -148,14 +154,7 @@ class GoogleAuthView(APIView):
                         'message': 'Account created successfully',
                         'user_exists': False,
                         'account_created': True,
-                        'user': {
-                            'id': str(user['_id']),
-                            'email': user['email'],
-                            'name': user.get('name', ''),
-                            'first_name': user.get('first_name', ''),
-                            'last_name': user.get('last_name', ''),
-                            'profile_picture': user.get('profile_picture', ''),
-                        },
+                        'user': _serialize_user(user),
                     }
                     
                     response = Response(response_data, status=status.HTTP_201_CREATED)
@@ -163,7 +162,7 @@ class GoogleAuthView(APIView):
                     # Set tokens in secure httpOnly cookies
                     JWTService.set_tokens_in_cookies(response, tokens)
                     
-                    logger.info(f"New user created via Google SSO: {email}")
+                    logger.info("New user created via Google SSO: %s", email)
                     return response
                 
                 else:
@@ -183,13 +182,13 @@ class GoogleAuthView(APIView):
                     }, status=status.HTTP_200_OK)
             
         except ValueError as e:
-            logger.warning(f"Google auth failed: {str(e)}")
+            logger.warning("Google auth failed: %s", e)
             return Response(
                 {'error': str(e)},
                 status=status.HTTP_401_UNAUTHORIZED
             )
         except Exception as e:
-            logger.error(f"Google auth error: {str(e)}", exc_info=True)
+            logger.error("Google auth error: %s", e, exc_info=True)
             return Response(
                 {'error': 'Google authentication failed. Please try again.'},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
@@ -228,62 +227,38 @@ class GoogleSignupView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        email = user_info['email']
+        # Normalize the client-supplied email once for every lookup below
+        user_info['email'] = user_info['email'].lower()
         
         try:
-            # Check if user was created in the meantime (race condition)
-            if GoogleOAuthService.check_user_exists(email):
-                # User already exists - just log them in
-                user = GoogleOAuthService.authenticate_existing_user(email)
-                
-                tokens = JWTService.generate_tokens(user, request)
-                
-                response_data = {
-                    'message': 'Login successful (account already exists)',
-                    'user': {
-                        'id': str(user['_id']),
-                        'email': user['email'],
-                        'name': user.get('name', ''),
-                        'first_name': user.get('first_name', ''),
-                        'last_name': user.get('last_name', ''),
-                        'profile_picture': user.get('profile_picture', ''),
-                    },
-                }
-                
-                response = Response(response_data, status=status.HTTP_200_OK)
-                JWTService.set_tokens_in_cookies(response, tokens)
-                
-                return response
-            
-            # Create new user
-            user = GoogleOAuthService.create_new_user(user_info)
+            # Create the account, or log in if it was created in the meantime
+            # (one atomic upsert, so no separate existence check)
+            user, created = GoogleOAuthService.get_or_create_user(user_info)
             
             # Generate JWT tokens
             tokens = JWTService.generate_tokens(user, request)
             
             # Prepare response
             response_data = {
-                'message': 'Account created successfully',
-                'user': {
-                    'id': str(user['_id']),
-                    'email': user['email'],
-                    'name': user.get('name', ''),
-                    'first_name': user.get('first_name', ''),
-                    'last_name': user.get('last_name', ''),
-                    'profile_picture': user.get('profile_picture', ''),
-                },
+                'message': (
+                    'Account created successfully' if created
+                    else 'Login successful (account already exists)'
+                ),
+                'user': _serialize_user(user),
             }
             
-            response = Response(response_data, status=status.HTTP_201_CREATED)
+            response = Response(
+                response_data,
+                status=status.HTTP_201_CREATED if created else status.HTTP_200_OK
+            )
             
             # Set tokens in secure httpOnly cookies
             JWTService.set_tokens_in_cookies(response, tokens)
             
-            logger.info(f"New user created via Google SSO: {email}")
             return response
             
         except Exception as e:
-            logger.error(f"Google signup error: {str(e)}", exc_info=True)
+            logger.error("Google signup error: %s", e, exc_info=True)
             return Response(
                 {'error': 'Failed to create account. Please try again.'},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
@@ -325,11 +300,11 @@ class LogoutView(APIView):
             
             # Get user email from request if available
             user_email = getattr(request, 'user_email', 'unknown')
-            logger.info(f"User logged out: {user_email}")
+            logger.info("User logged out: %s", user_email)
             return response
             
         except Exception as e:
-            logger.error(f"Logout error: {str(e)}", exc_info=True)
+            logger.error("Logout error: %s", e, exc_info=True)
             return Response(
                 {'error': 'Logout failed. Please try again.'},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
@@ -352,6 +327,7 @@ class RefreshTokenView(APIView):
         Returns:
             200: New access token generated
             401: Invalid or expired refresh token
+            503: Token store unavailable; the refresh token is kept, retry later
         """
         try:
             # Get refresh token from cookies
@@ -374,26 +350,29 @@ class RefreshTokenView(APIView):
             
             # Set new access token in cookie
             response.set_cookie(
-                key='access_token',
-                value=tokens['access'],
+                'access_token',
+                tokens['access'],
                 max_age=tokens['access_expires_in'],
-                httponly=True,
-                secure=not settings.DEBUG,
-                samesite='Lax',
-                path='/',
+                **JWTService.COOKIE_KWARGS,
             )
             
             logger.debug("Access token refreshed")
             return response
             
         except ValueError as e:
-            logger.warning(f"Token refresh failed: {str(e)}")
+            logger.warning("Token refresh failed: %s", e)
             return Response(
                 {'error': str(e)},
                 status=status.HTTP_401_UNAUTHORIZED
             )
+        except PyMongoError as e:
+            logger.error("Token refresh unavailable: %s", e)
+            return Response(
+                {'error': 'Token refresh temporarily unavailable. Please retry.'},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE
+            )
         except Exception as e:
-            logger.error(f"Token refresh error: {str(e)}", exc_info=True)
+            logger.error("Token refresh error: %s", e, exc_info=True)
             return Response(
                 {'error': 'Token refresh failed. Please login again.'},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
@@ -427,9 +406,9 @@ class MeView(APIView):
                     status=status.HTTP_401_UNAUTHORIZED
                 )
             
-            # Get user from MongoDB
+            # Get user from MongoDB (usually already cached by the middleware)
             user_service = get_user_service()
-            user = user_service.find_user_by_email(user_email)
+            user = user_service.find_user_by_email_cached(user_email)
             
             if not user:
                 return Response(
@@ -438,19 +417,14 @@ class MeView(APIView):
                 )
             
             return Response({
-                'id': str(user['_id']),
-                'email': user['email'],
-                'name': user.get('name', ''),
-                'first_name': user.get('first_name', ''),
-                'last_name': user.get('last_name', ''),
-                'profile_picture': user.get('profile_picture', ''),
+                **_serialize_user(user),
                 'auth_provider': user.get('auth_provider', 'google'),
                 'created_at': user.get('created_at'),
                 'last_login': user.get('last_login'),
             }, status=status.HTTP_200_OK)
             
         except Exception as e:
-            logger.error(f"Error getting user info: {str(e)}", exc_info=True)
+            logger.error("Error getting user info: %s", e, exc_info=True)
             return Response(
                 {'error': 'Failed to get user information'},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
@@ -495,11 +469,11 @@ class RevokeAllTokensView(APIView):
             # Clear tokens from current session
             JWTService.clear_tokens_from_cookies(response)
             
-            logger.info(f"All tokens revoked for user: {user_email}")
+            logger.info("All tokens revoked for user: %s", user_email)
             return response
             
         except Exception as e:
-            logger.error(f"Token revocation error: {str(e)}", exc_info=True)
+            logger.error("Token revocation error: %s", e, exc_info=True)
             return Response(
                 {'error': 'Failed to revoke tokens. Please try again.'},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
@@ -0,0 +1,19 @@
+"""
+Authentication Web URL Configuration
+
+Defines URL patterns for the authentication web pages.
+"""
+
+from django.urls import path
+from authentication.web_views import (
+    LoginView,
+    GoogleCallbackView,
+)
+
+app_name = 'authentication'
+
+urlpatterns = [
+    # Web pages
+    path('login/', LoginView.as_view(), name='login'),
+    path('google/callback/', GoogleCallbackView.as_view(), name='google-callback'),
+]
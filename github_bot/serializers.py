@@ -1,10 +1,51 @@
 """
 DRF serializers for GitHub Bot API.
 """
+import copy
+
 from rest_framework import serializers
 
+from github_bot.constants import GROQ_MODELS
+
+# Built once; the model table is static for the life of the process
+VALID_MODEL_IDS = frozenset(GROQ_MODELS)
+MODEL_ID_ERROR = "Invalid model_id. Available models: " + ", ".join(
+    f"{k}={v}" for k, v in GROQ_MODELS.items()
+)
+
+# Declared fields per serializer class, deep-copied once by DRF's get_fields()
+_FIELDS_CACHE = {}
+
+
+def _copy_field(field):
+    """Shallow-copy a field, plus its child field (ListField) re-parented to the copy."""
+    field = copy.copy(field)
+    child = getattr(field, 'child', None)
+    if child is not None:
+        field.child = _copy_field(child)
+        field.child.parent = field
+    return field
+
+
+class CachedFieldsMixin:
+    """
+    Build a serializer class's fields once and hand out shallow copies.
+    
+    DRF deep-copies every declared field for each serializer instance; the
+    request serializers here are instantiated on every API call, so the
+    prototypes are cached per class. Each instance still gets its own Field
+    objects, since binding sets per-instance state (parent, field_name).
+    """
+    
+    def get_fields(self):
+        cls = type(self)
+        fields = _FIELDS_CACHE.get(cls)
+        if fields is None:
+            fields = _FIELDS_CACHE[cls] = super().get_fields()
+        return {name: _copy_field(field) for name, field in fields.items()}
+
 
-class ChatRequestSerializer(serializers.Serializer):
+class ChatRequestSerializer(CachedFieldsMixin, serializers.Serializer):
     """Serializer for chat request."""
     
     prompt = serializers.CharField(
@@ -41,12 +82,8 @@ class ChatRequestSerializer(serializers.Serializer):
     
     def validate_model_id(self, value):
         """Validate that model_id is a valid option."""
-        from github_bot.constants import GROQ_MODELS
-        if value not in GROQ_MODELS:
-            available_models = ", ".join([f"{k}={v}" for k, v in GROQ_MODELS.items()])
-            raise serializers.ValidationError(
-                f"Invalid model_id. Available models: {available_models}"
-            )
+        if value not in VALID_MODEL_IDS:
+            raise serializers.ValidationError(MODEL_ID_ERROR)
         return value
 
 
@@ -60,7 +97,7 @@ class ChatResponseSerializer(serializers.Serializer):
     metadata = serializers.DictField(required=False, allow_null=True)
 
 
-class CodeReviewRequestSerializer(serializers.Serializer):
+class CodeReviewRequestSerializer(CachedFieldsMixin, serializers.Serializer):
     """Serializer for code review request."""
     
     code = serializers.CharField(
@@ -96,7 +133,7 @@ class CodeReviewRequestSerializer(serializers.Serializer):
         return value.strip()
 
 
-class FileReviewRequestSerializer(serializers.Serializer):
+class FileReviewRequestSerializer(CachedFieldsMixin, serializers.Serializer):
     """Serializer for file review request."""
     
     owner = serializers.CharField(
@@ -124,7 +161,7 @@ class FileReviewRequestSerializer(serializers.Serializer):
     )
 
 
-class ImprovementRequestSerializer(serializers.Serializer):
+class ImprovementRequestSerializer(CachedFieldsMixin, serializers.Serializer):
     """Serializer for code improvement suggestions request."""
     
     code = serializers.CharField(
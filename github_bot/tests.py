@@ -1,4 +1,247 @@
-from django.test import TestCase
+import json
+import threading
+import time
+from unittest import mock
 
-# Create your tests here.
+from django.test import SimpleTestCase
 
+from github_bot.utils.code_review_service import (
+    CodeReviewService,
+    IMPROVEMENT_SYSTEM_INSTRUCTION,
+    LARGE_FILE_CHARS,
+    PREVIEW_BUDGET_CHARS,
+    REVIEW_SYSTEM_INSTRUCTION,
+)
+from github_bot.utils.cache import HEAP_COMPACT_FACTOR, SimpleCache, github_cache
+from github_bot.utils.chat_service import REPO_NAME_LOOKUP_CACHE_KEY, ChatService
+from github_bot.utils.database import _LogBuffer
+
+# System instructions as they were before being shortened, for token comparisons
+ORIGINAL_REVIEW_SYSTEM_INSTRUCTION = """You are an expert code reviewer with deep knowledge of software engineering best practices.
+
+Your reviews should be:
+- **Constructive**: Focus on improvement, not criticism
+- **Specific**: Provide concrete examples and suggestions
+- **Prioritized**: Highlight critical issues first
+- **Educational**: Explain why something is an issue
+- **Practical**: Suggest realistic improvements
+
+Consider:
+- Code quality and maintainability
+- Performance and efficiency
+- Security vulnerabilities
+- Best practices and design patterns
+- Error handling and edge cases
+- Code readability and documentation"""
+
+ORIGINAL_IMPROVEMENT_SYSTEM_INSTRUCTION = """You are a code optimization expert who helps developers write better code.
+
+Provide:
+- Clear, actionable suggestions
+- Before/after code examples
+- Explanation of benefits
+- Priority levels (critical, important, nice-to-have)
+
+Focus on:
+- Performance optimization
+- Code readability
+- Maintainability
+- Security
+- Best practices"""
+
+
+def estimate_tokens(text):
+    """Rough token count (1 token ≈ 4 chars), as used elsewhere in the bot."""
+    return len(text) // 4
+
+
+class SystemInstructionTests(SimpleTestCase):
+    def assertTokenDrop(self, original, shortened, fraction):
+        self.assertLessEqual(estimate_tokens(shortened), estimate_tokens(original) * (1 - fraction))
+
+    def test_review_instruction_is_at_least_40_percent_shorter(self):
+        self.assertTokenDrop(ORIGINAL_REVIEW_SYSTEM_INSTRUCTION, REVIEW_SYSTEM_INSTRUCTION, 0.4)
+
+    def test_improvement_instruction_is_at_least_40_percent_shorter(self):
+        self.assertTokenDrop(ORIGINAL_IMPROVEMENT_SYSTEM_INSTRUCTION, IMPROVEMENT_SYSTEM_INSTRUCTION, 0.4)
+
+
+class ExtractSalientTests(SimpleTestCase):
+    def setUp(self):
+        self.service = CodeReviewService()
+
+    def test_long_lines_are_truncated_not_dropped(self):
+        for content in ("var a=1;" * 1000, "x" * 3500):
+            preview = self.service._extract_salient(content)
+            self.assertTrue(content.startswith(preview))
+            self.assertGreater(len(preview), PREVIEW_BUDGET_CHARS - 10)
+            self.assertLessEqual(len(preview), PREVIEW_BUDGET_CHARS)
+
+    def test_salient_lines_are_kept(self):
+        filler = "\n".join("x = %d" % i for i in range(1000))
+        content = filler + "\ndef important():\n    eval(data)\n" + filler
+        preview = self.service._extract_salient(content)
+        self.assertIn("def important():", preview)
+        self.assertIn("eval(data)", preview)
+        self.assertIn("lines elided", preview)
+
+
+class LogBufferTests(SimpleTestCase):
+    def test_full_queue_drops_and_counts(self):
+        buffer = _LogBuffer(max_size=2)
+        with mock.patch.object(buffer, "_ensure_thread"):
+            for i in range(5):
+                buffer.enqueue("chat_logs", {"n": i})
+        self.assertEqual(buffer._queue.qsize(), 2)
+        self.assertEqual(buffer.dropped, 3)
+
+
+class SimpleCacheTests(SimpleTestCase):
+    def test_heap_stays_bounded(self):
+        cache = SimpleCache(default_ttl_seconds=300, maxsize=10)
+        for i in range(20000):
+            cache.set("key-%d" % (i % 50), i)
+            if i % 7 == 0:
+                cache.clear("key-%d" % (i % 50))
+        self.assertLessEqual(len(cache._heap), HEAP_COMPACT_FACTOR * cache.maxsize)
+        self.assertLessEqual(len(cache._values), cache.maxsize)
+        self.assertEqual(cache.get("key-48"), 19998)
+
+    def test_expired_entries_are_evicted_after_compaction(self):
+        cache = SimpleCache(default_ttl_seconds=300, maxsize=2)
+        for i in range(10):
+            cache.set("key", i, ttl_seconds=-1)
+        self.assertIsNone(cache.get("key"))
+        self.assertEqual(cache.get_stats()["total_entries"], 0)
+
+
+class RepositoryContextDetectionTests(SimpleTestCase):
+    def setUp(self):
+        # Skip __init__, which builds the GitHub and Groq clients
+        self.service = ChatService.__new__(ChatService)
+        self.service.github_service = mock.Mock()
+        self.service.github_service.get_user_repositories.return_value = [
+            {"name": "django-blog", "owner": {"login": "octo"}},
+            {"name": "Notes", "owner": {"login": "octo"}},
+        ]
+        self.addCleanup(github_cache.clear, REPO_NAME_LOOKUP_CACHE_KEY)
+
+    def test_repository_names_and_trigger_words(self):
+        self.assertTrue(self.service._needs_repository_context("and my django-blog one?"))
+        self.assertTrue(self.service._needs_repository_context("What about NOTES?"))
+        self.assertTrue(self.service._needs_repository_context("which files changed?"))
+        self.assertFalse(self.service._needs_repository_context("thanks, that helps"))
+
+    def _gather(self, prompt, history):
+        with mock.patch.object(ChatService, "_get_conversation_history", return_value=history), \
+                mock.patch.object(ChatService, "_get_repository_context", return_value="context") as fetch:
+            return self.service._gather_context("conv", prompt), fetch
+
+    def test_gather_context_fetches_when_needed(self):
+        history = [{"role": "user", "content": "hi"}]
+        result, fetch = self._gather("and my django-blog one?", history)
+        self.assertEqual(result, (history, "context"))
+        fetch.assert_called_once_with("and my django-blog one?")
+
+    def test_gather_context_skips_follow_ups(self):
+        history = [{"role": "user", "content": "hi"}]
+        result, fetch = self._gather("thanks, that helps", history)
+        self.assertEqual(result, (history, None))
+        fetch.assert_not_called()
+
+        result, fetch = self._gather("thanks, that helps", [])
+        self.assertEqual(result, ([], "context"))
+        fetch.assert_called_once_with("thanks, that helps")
+
+
+class BatchedReviewTests(SimpleTestCase):
+    FILES = [("a = 1\n", "a.py"), ("let b = 2;\n", "b.js"), ("c = 3\n", "c.py")]
+
+    def setUp(self):
+        self.service = CodeReviewService()
+        self.service.groq_service = mock.Mock()
+        self.service.groq_service.chat.return_value = "single review"
+
+    def _respond(self, text, ok=True):
+        self.service.groq_service.chat_result.return_value = (ok, text, None)
+        return self.service.review_files_batched(self.FILES)
+
+    def _assert_fell_back(self, results):
+        self.assertEqual(self.service.groq_service.chat.call_count, len(self.FILES))
+        self.assertEqual([r["review"]["full_review"] for r in results], ["single review"] * len(self.FILES))
+
+    def test_out_of_order_array(self):
+        items = [{"index": 3, "review": "third"}, {"index": 1, "review": "first"},
+                 {"index": 2, "review": "second"}]
+        results = self._respond(json.dumps(items))
+        self.assertEqual([r["review"]["full_review"] for r in results], ["first", "second", "third"])
+        self.assertEqual([r["language"] for r in results], ["python", "javascript", "python"])
+        self.service.groq_service.chat.assert_not_called()
+
+    def test_fenced_array(self):
+        items = [{"index": n, "review": "r%d" % n} for n in (1, 2, 3)]
+        results = self._respond("```json\n%s\n```" % json.dumps(items))
+        self.assertEqual([r["review"]["full_review"] for r in results], ["r1", "r2", "r3"])
+
+    def test_missing_or_duplicate_index_falls_back(self):
+        missing = [{"index": n, "review": "r"} for n in (1, 2)]
+        self._assert_fell_back(self._respond(json.dumps(missing)))
+
+        self.service.groq_service.chat.reset_mock()
+        duplicate = [{"index": n, "review": "r"} for n in (1, 2, 2, 3)]
+        self._assert_fell_back(self._respond(json.dumps(duplicate)))
+
+    def test_non_list_payload_falls_back(self):
+        self._assert_fell_back(self._respond(json.dumps({"index": 1, "review": "r"})))
+
+    def test_failed_request_falls_back(self):
+        self._assert_fell_back(self._respond("Rate limited", ok=False))
+
+    def test_large_files_bypass_batch(self):
+        large = ("x = 1\n" * (LARGE_FILE_CHARS // 6 + 1), "big.py")
+        self.service.groq_service.chat_result.return_value = (
+            True, json.dumps([{"index": 1, "review": "small"}]), None
+        )
+        results = self.service.review_files_batched([large, ("a = 1\n", "a.py")])
+        self.assertTrue(results[0]["review"]["is_preview"])
+        self.assertEqual(results[1]["review"]["full_review"], "small")
+        prompt = self.service.groq_service.chat_result.call_args.kwargs["prompt"]
+        self.assertNotIn("big.py", prompt)
+
+    def test_results_match_analyze_file_keys(self):
+        single = self.service.analyze_file(*self.FILES[0])
+        items = [{"index": n, "review": "r"} for n in (1, 2, 3)]
+        for result in self._respond(json.dumps(items)):
+            self.assertEqual(result.keys(), single.keys())
+            self.assertEqual(result["review"].keys(), single["review"].keys())
+
+
+class ReviewManyTests(SimpleTestCase):
+    def setUp(self):
+        self.service = CodeReviewService()
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.peak = 0
+
+    def _analyze_file(self, content, path, model_id=None):
+        with self.lock:
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+        # Earlier files finish last, so ordering cannot come from completion order
+        time.sleep(0.005 * (10 - int(content)))
+        with self.lock:
+            self.in_flight -= 1
+        return {"path": path, "model_id": model_id}
+
+    def test_results_keep_input_order_and_cap_concurrency(self):
+        files = [(str(n), "f%d.py" % n) for n in range(8)]
+        with mock.patch.object(self.service, "analyze_file", side_effect=self._analyze_file):
+            results = self.service.review_many(files, model_id=2, max_workers=3)
+        self.assertEqual(results, [{"path": path, "model_id": 2} for _, path in files])
+        self.assertLessEqual(self.peak, 3)
+        self.assertGreater(self.peak, 1)
+
+    def test_empty_input(self):
+        with mock.patch.object(self.service, "analyze_file") as analyze_file:
+            self.assertEqual(self.service.review_many([]), [])
+        analyze_file.assert_not_called()
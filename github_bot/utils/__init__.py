@@ -5,7 +5,7 @@ This module provides clean exports for commonly used utility classes and functio
 """
 
 # Core services
-from github_bot.utils.chat_service import ChatService
+from github_bot.utils.chat_service import ChatService, get_chat_service
 from github_bot.utils.github_service import GitHubService
 from github_bot.utils.groq_service import GroqService
 from github_bot.utils.code_review_service import CodeReviewService
@@ -19,6 +19,7 @@ from github_bot.utils.database import (
     save_request_log,
     save_error_log,
     save_conversation_message,
+    save_conversation_messages,
     get_conversation_history,
     clear_conversation,
 )
@@ -26,6 +27,7 @@ from github_bot.utils.database import (
 __all__ = [
     # Core services
     'ChatService',
+    'get_chat_service',
     'GitHubService',
     'GroqService',
     'CodeReviewService',
@@ -39,6 +41,7 @@ __all__ = [
     'save_request_log',
     'save_error_log',
     'save_conversation_message',
+    'save_conversation_messages',
     'get_conversation_history',
     'clear_conversation',
 ]
@@ -1,26 +1,42 @@
 """
 Simple caching utility for GitHub data to reduce API calls.
 """
+import heapq
+from collections import OrderedDict
+import threading
 import time
 import logging
-from typing import Dict, Any, Optional
-from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
+# The expiry heap is rebuilt from live entries once it holds this many
+# records per cache slot (re-sets, LRU evictions and clears leave stale ones)
+HEAP_COMPACT_FACTOR = 2
+
 
 class SimpleCache:
     """Simple in-memory cache with TTL support."""
     
-    def __init__(self, default_ttl_seconds: int = 300):
+    def __init__(self, default_ttl_seconds: int = 300, maxsize: int = 1024):
         """
         Initialize cache.
         
         Args:
             default_ttl_seconds: Default time-to-live in seconds (default: 5 minutes)
+            maxsize: Maximum number of entries; least recently used are evicted
         """
-        self._cache: Dict[str, Dict[str, Any]] = {}
+        # Parallel key -> value and key -> expiry maps; no per-entry dict.
+        # _values is kept in LRU order (most recently used last).
+        self._values: OrderedDict[str, Any] = OrderedDict()
+        self._expires: Dict[str, float] = {}
+        # Min-heap of (expires_at, key); entries whose expiry no longer
+        # matches _expires are stale (key was re-set or cleared) and skipped
+        self._heap: List[Tuple[float, str]] = []
+        # Shared across request threads; guards all three structures
+        self._lock = threading.Lock()
         self.default_ttl = default_ttl_seconds
+        self.maxsize = maxsize
     
     def get(self, key: str) -> Optional[Any]:
         """
@@ -32,19 +48,26 @@ class SimpleCache:
         Returns:
             Cached value or None if not found or expired
         """
-        if key not in self._cache:
-            return None
-        
-        entry = self._cache[key]
+        now = time.time()
+        with self._lock:
+            self._evict_expired(now)
+            
+            expires_at = self._expires.get(key)
+            if expires_at is None:
+                return None
+            
+            # Check if expired
+            if now > expires_at:
+                self._values.pop(key, None)
+                self._expires.pop(key, None)
+                logger.debug("Cache expired for key: %s", key)
+                return None
+            
+            value = self._values[key]
+            self._values.move_to_end(key)
         
-        # Check if expired
-        if time.time() > entry['expires_at']:
-            del self._cache[key]
-            logger.debug(f"Cache expired for key: {key}")
-            return None
-        
-        logger.debug(f"Cache hit for key: {key}")
-        return entry['value']
+        logger.debug("Cache hit for key: %s", key)
+        return value
     
     def set(self, key: str, value: Any, ttl_seconds: Optional[int] = None) -> None:
         """
@@ -56,14 +79,24 @@ class SimpleCache:
             ttl_seconds: Time-to-live in seconds (uses default if not specified)
         """
         ttl = ttl_seconds if ttl_seconds is not None else self.default_ttl
+        now = time.time()
+        expires_at = now + ttl
+        with self._lock:
+            self._evict_expired(now)
+            self._values[key] = value
+            self._values.move_to_end(key)
+            self._expires[key] = expires_at
+            heapq.heappush(self._heap, (expires_at, key))
+            
+            if len(self._values) > self.maxsize:
+                # Its heap record becomes stale and is skipped when popped
+                lru_key, _ = self._values.popitem(last=False)
+                del self._expires[lru_key]
+            
+            if len(self._heap) > HEAP_COMPACT_FACTOR * self.maxsize:
+                self._compact_heap()
         
-        self._cache[key] = {
-            'value': value,
-            'expires_at': time.time() + ttl,
-            'created_at': time.time()
-        }
-        
-        logger.debug(f"Cache set for key: {key} (TTL: {ttl}s)")
+        logger.debug("Cache set for key: %s (TTL: %ss)", key, ttl)
     
     def clear(self, key: Optional[str] = None) -> None:
         """
@@ -72,13 +105,16 @@ class SimpleCache:
         Args:
             key: Specific key to clear, or None to clear all
         """
-        if key:
-            if key in self._cache:
-                del self._cache[key]
-                logger.debug(f"Cache cleared for key: {key}")
-        else:
-            self._cache.clear()
-            logger.debug("Cache cleared completely")
+        with self._lock:
+            if key:
+                if self._expires.pop(key, None) is not None:
+                    self._values.pop(key, None)
+                    logger.debug("Cache cleared for key: %s", key)
+            else:
+                self._values.clear()
+                self._expires.clear()
+                self._heap.clear()
+                logger.debug("Cache cleared completely")
     
     def cleanup_expired(self) -> int:
         """
@@ -87,26 +123,52 @@ class SimpleCache:
         Returns:
             Number of entries removed
         """
-        current_time = time.time()
-        expired_keys = [
-            key for key, entry in self._cache.items()
-            if current_time > entry['expires_at']
-        ]
+        with self._lock:
+            removed = self._evict_expired(time.time())
+        
+        if removed and logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Cleaned up %d expired cache entries", removed)
+        
+        return removed
+    
+    def _evict_expired(self, now: float) -> int:
+        """
+        Pop expired entries off the expiry heap. Caller must hold _lock.
         
-        for key in expired_keys:
-            del self._cache[key]
+        Only entries that have actually expired are touched, so the cost is
+        proportional to the number evicted rather than the cache size.
         
-        if expired_keys:
-            logger.debug(f"Cleaned up {len(expired_keys)} expired cache entries")
+        Returns:
+            Number of entries removed
+        """
+        heap = self._heap
+        removed = 0
+        while heap and heap[0][0] < now:
+            expires_at, key = heapq.heappop(heap)
+            if self._expires.get(key) == expires_at:
+                del self._values[key]
+                del self._expires[key]
+                removed += 1
+        return removed
+    
+    def _compact_heap(self) -> None:
+        """
+        Rebuild the expiry heap from _expires, dropping stale records.
+        Caller must hold _lock.
         
-        return len(expired_keys)
+        The rebuilt heap holds at most maxsize records, so this runs at most
+        once per maxsize sets and stays O(1) amortized.
+        """
+        self._heap = [(expires_at, key) for key, expires_at in self._expires.items()]
+        heapq.heapify(self._heap)
     
     def get_stats(self) -> Dict[str, Any]:
         """Get cache statistics."""
-        return {
-            'total_entries': len(self._cache),
-            'keys': list(self._cache.keys())
-        }
+        with self._lock:
+            return {
+                'total_entries': len(self._expires),
+                'keys': list(self._expires.keys())
+            }
 
 
 # Global cache instance for GitHub data
@@ -1,16 +1,22 @@
 """
 Main chat service that orchestrates GitHub and Groq AI services.
 """
+import atexit
 import logging
+import re
+import secrets
+import threading
 import time
-import uuid
-from typing import Dict, Any, Optional, List
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Optional, List, Tuple
 from github_bot.utils.github_service import GitHubService
 from github_bot.utils.groq_service import GroqService
+from github_bot.utils.cache import github_cache
 from github_bot.utils.database import (
     save_chat_log, 
     save_error_log,
     save_conversation_message,
+    save_conversation_messages,
     get_conversation_history,
     clear_conversation
 )
@@ -18,10 +24,30 @@ from github_bot.constants import MAX_CONVERSATION_MESSAGES, MAX_CONVERSATION_TOK
 
 logger = logging.getLogger(__name__)
 
+# github_cache key for the lowercased repo-name table built from a repo listing
+REPO_NAME_LOOKUP_CACHE_KEY = "user_repos_name_lookup"
+
+# Words that mark a prompt as being about the user's GitHub data. Later turns
+# without any of them skip the repository context fetch.
+REPO_CONTEXT_TRIGGERS = frozenset({
+    "repo", "repos", "repository", "repositories", "project", "projects",
+    "code", "codebase", "file", "files", "folder", "structure", "readme",
+    "commit", "commits", "branch", "branches", "pr", "prs", "pull", "issue", "issues",
+    "function", "class", "implementation", "language", "stars", "github",
+})
+_WORD_RE = re.compile(r"\w+")
+
+# Shared pool for overlapping the MongoDB history read with the GitHub fetch
+_io_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="chat-io")
+# Let queued background saves finish on graceful shutdown
+atexit.register(_io_pool.shutdown, wait=True)
+
 
 class ChatService:
     """Service for handling chat interactions with GitHub bot."""
     
+    __slots__ = ("github_service", "groq_service")
+    
     def __init__(self):
         self.github_service = GitHubService()
         self.groq_service = GroqService()
@@ -29,7 +55,7 @@ class ChatService:
     def _get_or_create_conversation_id(self, conversation_id: Optional[str]) -> str:
         """Get existing conversation ID or generate a new one."""
         if not conversation_id:
-            new_id = str(uuid.uuid4())
+            new_id = secrets.token_urlsafe(16)
             logger.info(f"Generated new conversation_id: {new_id}")
             return new_id
         logger.info(f"Using existing conversation_id: {conversation_id}")
@@ -58,6 +84,20 @@ class ChatService:
             logger.warning(f"Failed to retrieve conversation history: {str(e)}")
             return []
 
+    def _get_repo_name_lookup(self, repos: List[Dict[str, Any]]) -> List[Tuple[Dict[str, Any], str]]:
+        """
+        Return (repo, lowercased name) pairs for a repository listing.
+        
+        The table is cached next to the listing and rebuilt only when
+        get_user_repositories() hands back a different list object.
+        """
+        cached = github_cache.get(REPO_NAME_LOOKUP_CACHE_KEY)
+        if cached is not None and cached[0] is repos:
+            return cached[1]
+        lowered_repos = [(repo, repo['name'].lower()) for repo in repos]
+        github_cache.set(REPO_NAME_LOOKUP_CACHE_KEY, (repos, lowered_repos), ttl_seconds=300)
+        return lowered_repos
+
     def _get_repository_context(self, prompt: str) -> Optional[str]:
         """Fetch repository context based on prompt with smart detection."""
         logger.info("Fetching repository context...")
@@ -66,14 +106,13 @@ class ChatService:
             repos = self.github_service.get_user_repositories()
             specific_repo = None
             prompt_lower = prompt.lower()
-            
+            prompt_words = set(prompt_lower.split())
+            lowered_repos = self._get_repo_name_lookup(repos)
+
             # Try to identify if user is asking about a specific repo
-            for repo in repos:
-                repo_name_lower = repo['name'].lower()
+            for repo, repo_name_lower in lowered_repos:
                 # Check for exact or partial match
-                if repo_name_lower in prompt_lower or any(
-                    word == repo_name_lower for word in prompt_lower.split()
-                ):
+                if repo_name_lower in prompt_lower or repo_name_lower in prompt_words:
                     specific_repo = repo
                     break
             
@@ -104,22 +143,61 @@ class ChatService:
             logger.warning(f"Failed to fetch repository context: {str(e)}")
             return "Repository information temporarily unavailable."
 
+    def _gather_context(self, conversation_id: str, prompt: str) -> Tuple[List[Dict[str, str]], Optional[str]]:
+        """
+        Load conversation history and repository context concurrently.
+        
+        The history read runs on the I/O pool while the repository context
+        is built on the calling thread; both helpers handle their own errors.
+        Repository context is only fetched for the first turn of a
+        conversation or when the prompt names one of the user's repositories
+        or mentions repository-related words.
+        
+        Returns:
+            Tuple of (conversation history, repository context or None)
+        """
+        history_future = _io_pool.submit(self._get_conversation_history, conversation_id)
+        if self._needs_repository_context(prompt):
+            repository_context = self._get_repository_context(prompt)
+            return history_future.result(), repository_context
+        
+        conversation_history = history_future.result()
+        if conversation_history:
+            logger.info("Skipping repository context for conversational follow-up")
+            return conversation_history, None
+        return conversation_history, self._get_repository_context(prompt)
+
+    def _needs_repository_context(self, prompt: str) -> bool:
+        """
+        Check whether the prompt names one of the user's repositories or
+        contains a repository trigger word.
+        
+        Names are matched the way _get_repository_context matches them, using
+        the cached repo-name table, so this adds no GitHub call while the
+        repository listing is cached.
+        """
+        prompt_lower = prompt.lower()
+        repos = self.github_service.get_user_repositories()
+        if any(name in prompt_lower for _, name in self._get_repo_name_lookup(repos)):
+            return True
+        return not REPO_CONTEXT_TRIGGERS.isdisjoint(_WORD_RE.findall(prompt_lower))
+
     def _save_interaction(self, conversation_id: str, prompt: str, response: str, model_id: Optional[int], context_exists: bool, history_length: int) -> None:
+        """Queue the interaction to be saved on the I/O pool without waiting for it."""
+        _io_pool.submit(
+            self._write_interaction,
+            conversation_id, prompt, response, model_id, context_exists, history_length
+        )
+
+    def _write_interaction(self, conversation_id: str, prompt: str, response: str, model_id: Optional[int], context_exists: bool, history_length: int) -> None:
         """Save the interaction to database (conversation and chat logs)."""
-        # Save conversation messages
+        # Save both conversation messages in one round-trip
         try:
-            save_conversation_message(
-                conversation_id=conversation_id,
-                role="user",
-                content=prompt,
-                metadata={"model_id": model_id}
-            )
-            save_conversation_message(
-                conversation_id=conversation_id,
-                role="assistant",
-                content=response,
-                metadata={"model_id": model_id}
-            )
+            metadata = {"model_id": model_id}
+            save_conversation_messages(conversation_id, [
+                {"role": "user", "content": prompt, "metadata": metadata},
+                {"role": "assistant", "content": response, "metadata": metadata},
+            ])
         except Exception as e:
             logger.warning(f"Failed to save conversation messages: {str(e)}")
         
@@ -139,6 +217,27 @@ class ChatService:
         except Exception as e:
             logger.warning(f"Failed to save chat log: {str(e)}")
 
+    def _write_stream_response(self, conversation_id: str, prompt: str, response: str, model_id: Optional[int], context_exists: bool, history_length: int) -> None:
+        """Save a streamed assistant reply and its chat log (runs on the I/O pool)."""
+        try:
+            save_conversation_message(
+                conversation_id=conversation_id,
+                role="assistant",
+                content=response
+            )
+            save_chat_log(
+                prompt=prompt,
+                response=response,
+                metadata={
+                    "model_id": model_id,
+                    "conversation_id": conversation_id,
+                    "has_context": context_exists,
+                    "history_length": history_length
+                }
+            )
+        except Exception:
+            logger.exception("Failed to save streamed chat response")
+
     def process_chat(
         self, 
         prompt: str, 
@@ -158,7 +257,7 @@ class ChatService:
         Returns:
             Dictionary with response and metadata
         """
-        start_time = time.time()
+        start_time = time.perf_counter()
         
         try:
             # Validate prompt
@@ -168,7 +267,7 @@ class ChatService:
                     "response": "Prompt cannot be empty.",
                     "error": "INVALID_PROMPT",
                     "metadata": {
-                        "duration_ms": round((time.time() - start_time) * 1000, 2)
+                        "duration_ms": round((time.perf_counter() - start_time) * 1000, 2)
                     }
                 }
             
@@ -177,38 +276,26 @@ class ChatService:
             self._handle_history_clearing(conversation_id, clear_history)
             
             # Get context and history
-            conversation_history = self._get_conversation_history(conversation_id)
-            repository_context = self._get_repository_context(prompt)
+            conversation_history, repository_context = self._gather_context(conversation_id, prompt)
             
             # Get AI response
             logger.info(f"Generating AI response with model_id: {model_id}")
-            ai_response = self.groq_service.chat(
+            ok, ai_response, error_code = self.groq_service.chat_result(
                 prompt=prompt,
                 repository_context=repository_context,
                 model_id=model_id,
                 conversation_history=conversation_history
             )
             
-            if ai_response is None:
-                return {
-                    "success": False,
-                    "response": "Failed to generate response. Please try again.",
-                    "error": "GROQ_ERROR",
-                    "metadata": {
-                        "duration_ms": round((time.time() - start_time) * 1000, 2),
-                        "model_id": model_id
-                    }
-                }
-            
-            # Check for error messages in response
-            if ai_response.startswith(("I've reached", "The AI model", "API authentication", "Connection", "An error occurred")):
+            if not ok:
                 return {
                     "success": False,
                     "response": ai_response,
                     "error": "GROQ_ERROR",
                     "metadata": {
-                        "duration_ms": round((time.time() - start_time) * 1000, 2),
-                        "model_id": model_id
+                        "duration_ms": round((time.perf_counter() - start_time) * 1000, 2),
+                        "model_id": model_id,
+                        "error_code": error_code
                     }
                 }
             
@@ -222,7 +309,7 @@ class ChatService:
                 history_length=len(conversation_history)
             )
             
-            duration_ms = (time.time() - start_time) * 1000
+            duration_ms = (time.perf_counter() - start_time) * 1000
             
             return {
                 "success": True,
@@ -251,7 +338,7 @@ class ChatService:
                 }
             )
             
-            duration_ms = (time.time() - start_time) * 1000
+            duration_ms = (time.perf_counter() - start_time) * 1000
             
             return {
                 "success": False,
@@ -283,11 +370,8 @@ class ChatService:
             # Handle history clearing
             self._handle_history_clearing(conversation_id, clear_history)
             
-            # Get conversation history
-            conversation_history = self._get_conversation_history(conversation_id)
-            
-            # Get repository context
-            repository_context = self._get_repository_context(prompt)
+            # Get conversation history and repository context
+            conversation_history, repository_context = self._gather_context(conversation_id, prompt)
             
             # Save user message
             save_conversation_message(
@@ -297,36 +381,25 @@ class ChatService:
             )
             
             # Stream AI response
-            full_response = ""
+            chunks: List[str] = []
             for chunk in self.groq_service.chat_stream(
                 prompt=prompt,
                 repository_context=repository_context,
                 model_id=model_id,
                 conversation_history=conversation_history
             ):
-                full_response += chunk
+                chunks.append(chunk)
                 yield {
                     "type": "content",
                     "content": chunk
                 }
+            full_response = "".join(chunks)
             
-            # Save assistant message
-            save_conversation_message(
-                conversation_id=conversation_id,
-                role="assistant",
-                content=full_response
-            )
-            
-            # Save to chat logs
-            save_chat_log(
-                prompt=prompt,
-                response=full_response,
-                metadata={
-                    "model_id": model_id,
-                    "conversation_id": conversation_id,
-                    "has_context": bool(repository_context),
-                    "history_length": len(conversation_history)
-                }
+            # Save assistant message and chat log in the background
+            _io_pool.submit(
+                self._write_stream_response,
+                conversation_id, prompt, full_response, model_id,
+                bool(repository_context), len(conversation_history)
             )
             
         except Exception as e:
@@ -336,3 +409,23 @@ class ChatService:
                 "error": str(e)
             }
 
+
+_chat_service: Optional[ChatService] = None
+_chat_service_lock = threading.Lock()
+
+
+def _build_chat_service() -> ChatService:
+    """Create the shared service once, even if several threads race here."""
+    global _chat_service
+    with _chat_service_lock:
+        if _chat_service is None:
+            _chat_service = ChatService()
+        return _chat_service
+
+
+def get_chat_service() -> ChatService:
+    """Get the ChatService instance shared by all requests in this process."""
+    service = _chat_service
+    if service is None:
+        service = _build_chat_service()
+    return service
@@ -1,13 +1,91 @@
 """
 Code review service for analyzing code quality and suggesting improvements.
 """
+import json
 import logging
-from typing import Dict, Any, Optional, List
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Optional, List, Tuple
 from github_bot.utils.groq_service import GroqService
 from github_bot.utils.database import save_error_log
 
 logger = logging.getLogger(__name__)
 
+# Upper bound on concurrent Groq calls made by review_many()
+MAX_CONCURRENT_REVIEWS = 4
+
+# Files larger than this get the focused single-file analysis
+LARGE_FILE_CHARS = 5000
+
+# Completion budget per file in a batched review request
+BATCH_REVIEW_TOKENS_PER_FILE = 512
+
+# File extension -> language name used in prompts and code fences
+EXTENSION_LANGUAGES = {
+    '.py': 'python',
+    '.js': 'javascript',
+    '.ts': 'typescript',
+    '.java': 'java',
+    '.cpp': 'cpp',
+    '.c': 'c',
+    '.go': 'go',
+    '.rs': 'rust',
+    '.rb': 'ruby',
+    '.php': 'php',
+    '.swift': 'swift',
+    '.kt': 'kotlin',
+    '.cs': 'csharp',
+    '.jsx': 'react',
+    '.tsx': 'react-typescript',
+    '.vue': 'vue',
+    '.html': 'html',
+    '.css': 'css',
+    '.sql': 'sql',
+    '.sh': 'bash',
+}
+
+# Character budget for the excerpt sent when reviewing a large file
+PREVIEW_BUDGET_CHARS = 3000
+
+# Lines always worth showing from a large file: definitions, open work
+# markers, and calls that commonly carry security or performance risk
+SALIENT_LINE_RE = re.compile(
+    r"^\s*(?:def |class |function |async def |fn |func |public |export )"
+    r"|TODO|FIXME|XXX|HACK"
+    r"|eval\(|exec\(|os\.system|subprocess|(?i:sql)"
+)
+
+# Lines of context kept around each salient line when the budget allows
+SALIENT_CONTEXT_LINES = 2
+
+# System instructions, kept terse: they are sent as input tokens on every call
+REVIEW_SYSTEM_INSTRUCTION = (
+    "You are an expert code reviewer. Reviews must be constructive, specific "
+    "(concrete examples), prioritized (critical issues first), educational "
+    "(explain why) and practical. Cover: quality and maintainability, "
+    "performance, security, best practices and design patterns, error handling "
+    "and edge cases, readability and documentation."
+)
+
+# Fixed opening of every review prompt; the context and code follow it
+REVIEW_PROMPT_INSTRUCTIONS = """Please provide:
+1. **Overall Assessment**: Brief summary of code quality
+2. **Strengths**: What's done well
+3. **Issues**: Problems found (bugs, security, performance)
+4. **Suggestions**: Specific improvements with examples
+5. **Best Practices**: Recommendations for better code
+
+Format your response in clear sections with markdown.
+
+"""
+
+IMPROVEMENT_SYSTEM_INSTRUCTION = (
+    "Suggest code optimizations as before/after examples with benefit and "
+    "priority (critical/important/nice-to-have). Focus: performance, "
+    "readability, maintainability, security, best practices."
+)
+
 
 class CodeReviewService:
     """Service for AI-powered code review and analysis."""
@@ -103,7 +181,7 @@ class CodeReviewService:
             language = self._detect_language(file_path)
             
             # For large files, focus on key issues
-            if len(file_content) > 5000:
+            if len(file_content) > LARGE_FILE_CHARS:
                 logger.info(f"Large file detected ({len(file_content)} chars), using focused analysis")
                 return self._analyze_large_file(file_content, language, file_path, model_id)
             
@@ -123,6 +201,134 @@ class CodeReviewService:
                 "error": "Failed to analyze file"
             }
     
+    def review_many(
+        self,
+        files: List[Tuple[str, str]],
+        model_id: Optional[int] = None,
+        max_workers: int = MAX_CONCURRENT_REVIEWS
+    ) -> List[Dict[str, Any]]:
+        """
+        Analyze several files, issuing their Groq requests concurrently.
+        
+        Args:
+            files: List of (file_content, file_path) tuples
+            model_id: Groq model ID to use
+            max_workers: Maximum number of reviews in flight at once
+        
+        Returns:
+            List of analyze_file() results, in the same order as files
+        """
+        if not files:
+            return []
+        
+        workers = min(max_workers, len(files))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(
+                lambda item: self.analyze_file(item[0], item[1], model_id=model_id),
+                files
+            ))
+    
+    def review_files_batched(
+        self,
+        files: List[Tuple[str, str]],
+        batch_size: int = 5,
+        model_id: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Review several files with one Groq request per batch of files.
+        
+        Each batch shares a single system instruction and round trip; the
+        model answers with a JSON array of per-file reviews. Large files, and
+        any batch whose response cannot be parsed, fall back to analyze_file().
+        
+        Args:
+            files: List of (file_content, file_path) tuples
+            batch_size: Maximum number of files per request
+            model_id: Groq model ID to use
+        
+        Returns:
+            List of review results, in the same order as files
+        """
+        results: List[Optional[Dict[str, Any]]] = [None] * len(files)
+        small = []
+        for index, (content, path) in enumerate(files):
+            if len(content) > LARGE_FILE_CHARS:
+                results[index] = self.analyze_file(content, path, model_id=model_id)
+            else:
+                small.append(index)
+        
+        for start in range(0, len(small), batch_size):
+            batch = small[start:start + batch_size]
+            reviews = self._review_batch([files[i] for i in batch], model_id)
+            for index, review in zip(batch, reviews):
+                results[index] = review
+        
+        return results
+    
+    def _review_batch(
+        self,
+        files: List[Tuple[str, str]],
+        model_id: Optional[int]
+    ) -> List[Dict[str, Any]]:
+        """Review one batch of small files in a single request."""
+        languages = [self._detect_language(path) for _, path in files]
+        
+        parts = [
+            "Review each of the following files. Respond only with a JSON array "
+            "ordered by index, one object per file: "
+            '{"index": <number>, "review": "<markdown review>"}. Each review should '
+            "cover overall assessment, strengths, issues, and suggestions."
+        ]
+        for number, ((content, path), language) in enumerate(zip(files, languages), start=1):
+            parts.append(f"[{number}] File: {path}\n```{language}\n{content}\n```")
+        
+        ok, response, _ = self.groq_service.chat_result(
+            prompt="\n\n".join(parts),
+            model_id=model_id,
+            system_instruction=self._get_review_system_instruction(),
+            max_tokens=BATCH_REVIEW_TOKENS_PER_FILE * len(files)
+        )
+        
+        reviews = self._parse_batch_response(response, len(files)) if ok else None
+        if reviews is None:
+            logger.warning(f"Batched review of {len(files)} files failed, reviewing individually")
+            return [self.analyze_file(content, path, model_id=model_id) for content, path in files]
+        
+        return [
+            {
+                "success": True,
+                "review": self._parse_review_response(review),
+                "language": language,
+                "code_length": len(content)
+            }
+            for review, (content, _), language in zip(reviews, files, languages)
+        ]
+    
+    def _parse_batch_response(self, response: str, count: int) -> Optional[List[str]]:
+        """
+        Extract per-file review texts from a batched JSON response.
+        
+        Returns:
+            Review texts ordered by index, or None if the response is unusable
+        """
+        text = response.strip()
+        if text.startswith("```"):
+            # Drop a ```json ... ``` fence around the array
+            text = text.split("\n", 1)[-1].rsplit("```", 1)[0]
+        
+        try:
+            items = json.loads(text)
+            if not isinstance(items, list):
+                return None
+            reviews = {int(item["index"]): str(item["review"]) for item in items}
+        except (ValueError, TypeError, KeyError):
+            return None
+        
+        # Exactly one review per file: no gaps, extras or duplicated indexes
+        if len(items) != count or set(reviews) != set(range(1, count + 1)):
+            return None
+        return [reviews[number] for number in range(1, count + 1)]
+    
     def suggest_improvements(
         self,
         code: str,
@@ -182,58 +388,23 @@ Provide specific, actionable suggestions with examples where possible."""
             }
     
     def _build_review_prompt(self, code: str, language: str, context: Optional[str]) -> str:
-        """Build the code review prompt."""
-        prompt = f"Review this {language} code:\n\n```{language}\n{code}\n```\n\n"
-        
-        if context:
-            prompt += f"Context: {context}\n\n"
-        
-        prompt += """Please provide:
-1. **Overall Assessment**: Brief summary of code quality
-2. **Strengths**: What's done well
-3. **Issues**: Problems found (bugs, security, performance)
-4. **Suggestions**: Specific improvements with examples
-5. **Best Practices**: Recommendations for better code
-
-Format your response in clear sections with markdown."""
+        """
+        Build the code review prompt.
         
-        return prompt
+        The fixed instructions come first so every review request shares a
+        byte-identical prefix (system instruction plus these lines) that the
+        provider can serve from its prompt cache; the code comes last.
+        """
+        context_block = f"Context: {context}\n\n" if context else ""
+        return f"{REVIEW_PROMPT_INSTRUCTIONS}{context_block}Review this {language} code:\n\n```{language}\n{code}\n```"
     
     def _get_review_system_instruction(self) -> str:
         """Get system instruction for code review."""
-        return """You are an expert code reviewer with deep knowledge of software engineering best practices.
-
-Your reviews should be:
-- **Constructive**: Focus on improvement, not criticism
-- **Specific**: Provide concrete examples and suggestions
-- **Prioritized**: Highlight critical issues first
-- **Educational**: Explain why something is an issue
-- **Practical**: Suggest realistic improvements
-
-Consider:
-- Code quality and maintainability
-- Performance and efficiency
-- Security vulnerabilities
-- Best practices and design patterns
-- Error handling and edge cases
-- Code readability and documentation"""
+        return REVIEW_SYSTEM_INSTRUCTION
     
     def _get_improvement_system_instruction(self) -> str:
         """Get system instruction for improvement suggestions."""
-        return """You are a code optimization expert who helps developers write better code.
-
-Provide:
-- Clear, actionable suggestions
-- Before/after code examples
-- Explanation of benefits
-- Priority levels (critical, important, nice-to-have)
-
-Focus on:
-- Performance optimization
-- Code readability
-- Maintainability
-- Security
-- Best practices"""
+        return IMPROVEMENT_SYSTEM_INSTRUCTION
     
     def _parse_review_response(self, response: str) -> Dict[str, Any]:
         """Parse the AI review response into structured data."""
@@ -246,34 +417,68 @@ Focus on:
     
     def _detect_language(self, file_path: str) -> str:
         """Detect programming language from file extension."""
-        ext_map = {
-            '.py': 'python',
-            '.js': 'javascript',
-            '.ts': 'typescript',
-            '.java': 'java',
-            '.cpp': 'cpp',
-            '.c': 'c',
-            '.go': 'go',
-            '.rs': 'rust',
-            '.rb': 'ruby',
-            '.php': 'php',
-            '.swift': 'swift',
-            '.kt': 'kotlin',
-            '.cs': 'csharp',
-            '.jsx': 'react',
-            '.tsx': 'react-typescript',
-            '.vue': 'vue',
-            '.html': 'html',
-            '.css': 'css',
-            '.sql': 'sql',
-            '.sh': 'bash',
-        }
+        ext = os.path.splitext(file_path)[1]
+        # Extensions are almost always lowercase already; only fold on a miss
+        return EXTENSION_LANGUAGES.get(ext) or EXTENSION_LANGUAGES.get(ext.lower(), 'text')
+    
+    def _extract_salient(self, file_content: str, budget_chars: int = PREVIEW_BUDGET_CHARS) -> str:
+        """
+        Build a review excerpt of a file that fits in a character budget.
+        
+        Lines matching SALIENT_LINE_RE are kept first, then their surrounding
+        context, then leading lines while budget remains. A line longer than
+        the budget left is truncated to fit. Skipped runs are replaced with an
+        elision marker.
+        
+        Args:
+            file_content: Full file content
+            budget_chars: Maximum characters of source lines to keep
+        
+        Returns:
+            Excerpt of the file, or the whole file if it fits the budget
+        """
+        if len(file_content) <= budget_chars:
+            return file_content
+        
+        lines = file_content.split("\n")
+        salient = [i for i, line in enumerate(lines) if SALIENT_LINE_RE.search(line)]
+        
+        # Candidate lines in priority order; duplicates are skipped below
+        candidates = list(salient)
+        for distance in range(1, SALIENT_CONTEXT_LINES + 1):
+            for i in salient:
+                candidates.extend((i - distance, i + distance))
+        candidates.extend(range(len(lines)))
+        
+        kept: Dict[int, str] = {}
+        remaining = budget_chars
+        for i in candidates:
+            if i in kept or not 0 <= i < len(lines):
+                continue
+            line = lines[i]
+            if len(line) + 1 > remaining:
+                # Cut a line that doesn't fit to the budget left, so long-line
+                # or minified files still send code rather than only markers
+                line = line[:remaining - 1]
+            kept[i] = line
+            remaining -= len(line) + 1
+            if remaining <= 0:
+                break
         
-        for ext, lang in ext_map.items():
-            if file_path.lower().endswith(ext):
-                return lang
+        parts = []
+        skipped = 0
+        for i in range(len(lines)):
+            if i in kept:
+                if skipped:
+                    parts.append(f"... [{skipped} lines elided] ...")
+                    skipped = 0
+                parts.append(kept[i])
+            else:
+                skipped += 1
+        if skipped:
+            parts.append(f"... [{skipped} lines elided] ...")
         
-        return 'text'
+        return "\n".join(parts)
     
     def _analyze_large_file(
         self,
@@ -283,8 +488,7 @@ Focus on:
         model_id: Optional[int]
     ) -> Dict[str, Any]:
         """Analyze large files with focused approach."""
-        # Take first 2000 chars and last 1000 chars
-        preview = file_content[:2000] + "\n\n... [middle content omitted] ...\n\n" + file_content[-1000:]
+        preview = self._extract_salient(file_content)
         
         prompt = f"""Analyze this {language} file for major issues:
 
@@ -1,29 +1,44 @@
 import os
+import atexit
+import queue
+import threading
+import time
 import certifi
-from pymongo import MongoClient
-from pymongo.errors import ConnectionFailure, ServerSelectionTimeoutError
-from datetime import datetime
-from typing import Dict, Any, Optional
+from bson import ObjectId
+from pymongo import MongoClient, WriteConcern
+from pymongo.errors import BulkWriteError, ConnectionFailure, ServerSelectionTimeoutError
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional, Tuple
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Log documents are written in batches of up to this many per flush...
+LOG_BATCH_SIZE = 100
+# ...or after waiting this long for a batch to fill
+LOG_FLUSH_INTERVAL_SECONDS = 0.1
+# Documents queued beyond this while MongoDB is slow or down are dropped
+LOG_QUEUE_MAX_SIZE = 10000
+# Log one warning per this many dropped documents
+LOG_DROP_WARNING_INTERVAL = 1000
+
+# Log collections are written without acknowledgement: losing a log line on
+# a crash is acceptable, waiting a round-trip for every batch is not
+UNACKNOWLEDGED = WriteConcern(w=0)
+
 
 class MongoDBConnection:
-    """Singleton MongoDB connection manager."""
-    
-    _instance = None
-    _client = None
-    _db = None
+    """
+    MongoDB connection manager.
     
-    def __new__(cls):
-        if cls._instance is None:
-            cls._instance = super(MongoDBConnection, cls).__new__(cls)
-        return cls._instance
+    Use get_connection() to obtain the shared, connected instance.
+    """
     
     def __init__(self):
-        if self._client is None:
-            self._connect()
+        self._client = None
+        self._db = None
+        self._log_db = None
+        self._connect()
     
     def _connect(self):
         """Establish MongoDB connection."""
@@ -46,6 +61,8 @@ class MongoDBConnection:
             self._client.admin.command('ping')
             logger.info("Successfully connected to MongoDB")
             
+            self._ensure_indexes()
+            
         except (ConnectionFailure, ServerSelectionTimeoutError) as e:
             logger.error(f"Failed to connect to MongoDB: {str(e)}")
             raise
@@ -53,6 +70,16 @@ class MongoDBConnection:
             logger.error(f"Unexpected error connecting to MongoDB: {str(e)}")
             raise
     
+    def _ensure_indexes(self):
+        """Create indexes used by the conversation history queries."""
+        try:
+            # Serves get_conversation_history's filter and sort without an in-memory sort
+            self._db["conversations"].create_index(
+                [("conversation_id", 1), ("timestamp", 1), ("_id", 1)]
+            )
+        except Exception as e:
+            logger.error(f"Error creating MongoDB indexes: {str(e)}")
+    
     @property
     def db(self):
         """Get database instance."""
@@ -60,6 +87,13 @@ class MongoDBConnection:
             self._connect()
         return self._db
     
+    @property
+    def log_db(self):
+        """Get the database handle for unacknowledged log writes (same client)."""
+        if self._log_db is None:
+            self._log_db = self.db.with_options(write_concern=UNACKNOWLEDGED)
+        return self._log_db
+    
     def get_collection(self, collection_name: str): 
         """Get a MongoDB collection."""
         return self.db[collection_name]
@@ -70,17 +104,146 @@ class MongoDBConnection:
             self._client.close()
             self._client = None
             self._db = None
+            self._log_db = None
+
+
+_connection: Optional[MongoDBConnection] = None
+_connection_lock = threading.Lock()
+
+
+def _build_connection() -> MongoDBConnection:
+    """Create the shared connection once, even if several threads race here."""
+    global _connection
+    with _connection_lock:
+        if _connection is None:
+            _connection = MongoDBConnection()
+        return _connection
+
+
+def get_connection() -> MongoDBConnection:
+    """Get the MongoDB connection shared by the whole process."""
+    connection = _connection
+    if connection is None:
+        connection = _build_connection()
+    return connection
 
 
 def get_db():
     """Get MongoDB database instance."""
-    connection = MongoDBConnection()
-    return connection.db
+    return get_connection().db
+
+
+def get_log_db():
+    """Get the MongoDB database instance used for log writes."""
+    return get_connection().log_db
+
+
+class _LogBuffer:
+    """
+    Queue log documents and write them with insert_many from a background thread.
+    
+    Used for the write-only log collections, which nothing reads back within
+    a request. A batch is written once it holds LOG_BATCH_SIZE documents or
+    LOG_FLUSH_INTERVAL_SECONDS after its first document arrived. The queue
+    holds at most LOG_QUEUE_MAX_SIZE documents; further ones are dropped and
+    counted rather than growing memory without bound.
+    """
+    
+    def __init__(self, max_batch: int = LOG_BATCH_SIZE, interval: float = LOG_FLUSH_INTERVAL_SECONDS,
+                 max_size: int = LOG_QUEUE_MAX_SIZE):
+        self._queue: "queue.Queue[Tuple[str, Dict[str, Any]]]" = queue.Queue(maxsize=max_size)
+        self._max_batch = max_batch
+        self._interval = interval
+        self._thread: Optional[threading.Thread] = None
+        self._thread_lock = threading.Lock()
+        self._dropped = 0
+        self._dropped_lock = threading.Lock()
+    
+    @property
+    def dropped(self) -> int:
+        """Number of documents dropped because the queue was full."""
+        return self._dropped
+    
+    def enqueue(self, collection_name: str, document: Dict[str, Any]) -> None:
+        """Queue a document for insertion, dropping it if the queue is full."""
+        self._ensure_thread()
+        try:
+            self._queue.put_nowait((collection_name, document))
+        except queue.Full:
+            with self._dropped_lock:
+                self._dropped += 1
+                dropped = self._dropped
+            if dropped % LOG_DROP_WARNING_INTERVAL == 1:
+                logger.warning(f"Log queue full, dropped {dropped} log documents so far")
+    
+    def flush(self) -> None:
+        """Synchronously write everything still queued (used at shutdown)."""
+        batch = []
+        while True:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        if batch:
+            self._write(batch)
+    
+    def _ensure_thread(self) -> None:
+        """Start the writer thread on first use, and again in forked workers."""
+        thread = self._thread
+        if thread is not None and thread.is_alive():
+            return
+        with self._thread_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name="mongo-log-writer", daemon=True
+                )
+                self._thread.start()
+    
+    def _run(self) -> None:
+        """Collect batches from the queue and write them, forever."""
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self._interval
+            while len(batch) < self._max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._write(batch)
+    
+    def _write(self, batch: List[Tuple[str, Dict[str, Any]]]) -> None:
+        """Insert a batch, one unordered insert_many per collection."""
+        by_collection: Dict[str, List[Dict[str, Any]]] = {}
+        for collection_name, document in batch:
+            by_collection.setdefault(collection_name, []).append(document)
+        
+        try:
+            db = get_log_db()
+        except Exception as e:
+            logger.error(f"Dropping {len(batch)} log documents, MongoDB unavailable: {str(e)}")
+            return
+        
+        for collection_name, documents in by_collection.items():
+            try:
+                db[collection_name].insert_many(documents, ordered=False)
+            except BulkWriteError as e:
+                failed = len(e.details.get("writeErrors", []))
+                logger.error(f"Failed to write {failed} of {len(documents)} {collection_name} documents")
+            except Exception as e:
+                logger.error(f"Error writing {len(documents)} {collection_name} documents: {str(e)}")
+
+
+_LOG_BUFFER = _LogBuffer()
+atexit.register(_LOG_BUFFER.flush)
 
 
 def save_chat_log(prompt: str, response: str, metadata: Optional[Dict[str, Any]] = None) -> str:
     """
-    Save chat log to MongoDB.
+    Queue a chat log for a batched write to MongoDB.
+    The creation time is available as _id.generation_time.
     
     Args:
         prompt: User's prompt/question
@@ -90,30 +253,22 @@ def save_chat_log(prompt: str, response: str, metadata: Optional[Dict[str, Any]]
     Returns:
         Document ID as string
     """
-    try:
-        db = get_db()
-        collection = db["chat_logs"]
-        
-        document = {
-            "prompt": prompt,
-            "response": response,
-            "timestamp": datetime.utcnow(),
-            "metadata": metadata or {}
-        }
-        
-        result = collection.insert_one(document)
-        logger.info(f"Chat log saved with ID: {result.inserted_id}")
-        return str(result.inserted_id)
-        
-    except Exception as e:
-        logger.error(f"Error saving chat log: {str(e)}")
-        raise
+    document = {
+        "_id": ObjectId(),
+        "prompt": prompt,
+        "response": response,
+        "metadata": metadata or {}
+    }
+    
+    _LOG_BUFFER.enqueue("chat_logs", document)
+    logger.info(f"Chat log queued with ID: {document['_id']}")
+    return str(document["_id"])
 
 
 def save_request_log(request_data: Dict[str, Any], response_data: Dict[str, Any], 
                     status_code: int, duration_ms: float) -> str:
     """
-    Save request/response log to MongoDB.
+    Queue a request/response log for a batched write to MongoDB.
     
     Args:
         request_data: Request data
@@ -124,32 +279,26 @@ def save_request_log(request_data: Dict[str, Any], response_data: Dict[str, Any]
     Returns:
         Document ID as string
     """
-    try:
-        db = get_db()
-        collection = db["request_logs"]
-        
-        document = {
-            "request": request_data,
-            "response": response_data,
-            "status_code": status_code,
-            "duration_ms": duration_ms,
-            "timestamp": datetime.utcnow()
-        }
-        
-        result = collection.insert_one(document)
-        logger.info(f"Request log saved with ID: {result.inserted_id}")
-        return str(result.inserted_id)
-        
-    except Exception as e:
-        logger.error(f"Error saving request log: {str(e)}")
-        raise
+    document = {
+        "_id": ObjectId(),
+        "request": request_data,
+        "response": response_data,
+        "status_code": status_code,
+        "duration_ms": duration_ms,
+        "timestamp": datetime.now(timezone.utc)
+    }
+    
+    _LOG_BUFFER.enqueue("request_logs", document)
+    logger.info(f"Request log queued with ID: {document['_id']}")
+    return str(document["_id"])
 
 
 def save_error_log(error_type: str, error_message: str, 
                   stack_trace: Optional[str] = None, 
                   context: Optional[Dict[str, Any]] = None) -> str:
     """
-    Save error log to MongoDB.
+    Queue an error log for a batched write to MongoDB.
+    The creation time is available as _id.generation_time.
     
     Args:
         error_type: Type of error
@@ -160,25 +309,17 @@ def save_error_log(error_type: str, error_message: str,
     Returns:
         Document ID as string
     """
-    try:
-        db = get_db()
-        collection = db["error_logs"]
-        
-        document = {
-            "error_type": error_type,
-            "error_message": error_message,
-            "stack_trace": stack_trace,
-            "context": context or {},
-            "timestamp": datetime.utcnow()
-        }
-        
-        result = collection.insert_one(document)
-        logger.error(f"Error log saved with ID: {result.inserted_id}")
-        return str(result.inserted_id)
-        
-    except Exception as e:
-        logger.error(f"Error saving error log: {str(e)}")
-        raise
+    document = {
+        "_id": ObjectId(),
+        "error_type": error_type,
+        "error_message": error_message,
+        "stack_trace": stack_trace,
+        "context": context or {}
+    }
+    
+    _LOG_BUFFER.enqueue("error_logs", document)
+    logger.error(f"Error log queued with ID: {document['_id']}")
+    return str(document["_id"])
 
 
 def save_conversation_message(conversation_id: str, role: str, content: str, 
@@ -203,7 +344,7 @@ def save_conversation_message(conversation_id: str, role: str, content: str,
             "conversation_id": conversation_id,
             "role": role,
             "content": content,
-            "timestamp": datetime.utcnow(),
+            "timestamp": datetime.now(timezone.utc),
             "metadata": metadata or {}
         }
         
@@ -216,6 +357,45 @@ def save_conversation_message(conversation_id: str, role: str, content: str,
         raise
 
 
+def save_conversation_messages(conversation_id: str, messages: List[Dict[str, Any]]) -> List[str]:
+    """
+    Save several conversation messages to MongoDB in one insert_many call.
+    
+    Args:
+        conversation_id: Unique conversation/session ID
+        messages: Dictionaries with 'role', 'content' and optional 'metadata',
+            in conversation order
+    
+    Returns:
+        List of document IDs as strings
+    """
+    try:
+        db = get_db()
+        collection = db["conversations"]
+        
+        # One timestamp for the whole batch; the client-side ObjectIds, which
+        # increase in list order, keep the messages in conversation order
+        timestamp = datetime.now(timezone.utc)
+        documents = [
+            {
+                "conversation_id": conversation_id,
+                "role": message["role"],
+                "content": message["content"],
+                "timestamp": timestamp,
+                "metadata": message.get("metadata") or {}
+            }
+            for message in messages
+        ]
+        
+        result = collection.insert_many(documents, ordered=True)
+        logger.debug(f"Saved {len(result.inserted_ids)} conversation messages")
+        return [str(inserted_id) for inserted_id in result.inserted_ids]
+        
+    except Exception as e:
+        logger.error(f"Error saving conversation messages: {str(e)}")
+        raise
+
+
 def get_conversation_history(conversation_id: str, max_messages: int = 10, 
                             max_tokens_estimate: int = 2000) -> list:
     """
@@ -234,35 +414,27 @@ def get_conversation_history(conversation_id: str, max_messages: int = 10,
         db = get_db()
         collection = db["conversations"]
         
-        # Get recent messages for this conversation, ordered by timestamp
-        cursor = collection.find(
-            {"conversation_id": conversation_id}
-        ).sort("timestamp", 1).limit(max_messages * 2)  # Get more to filter by tokens
-        
-        messages = []
-        total_chars = 0
-        
-        for doc in cursor:
-            content = doc.get("content", "")
-            content_length = len(content)
-            
-            # Rough token estimate: 1 token ≈ 4 characters
-            estimated_tokens = content_length / 4
-            
-            # Check if adding this message would exceed token limit
-            if total_chars + content_length > max_tokens_estimate * 4:
-                break
-            
-            messages.append({
-                "role": doc.get("role", "user"),
-                "content": content
-            })
-            
-            total_chars += content_length
-            
-            # Also limit by message count
-            if len(messages) >= max_messages:
-                break
+        # Oldest max_messages messages, cut server-side at the first one that
+        # would push the running content length (1 token ≈ 4 chars) past the
+        # budget. _id breaks ties between messages saved in the same
+        # millisecond. Served by the (conversation_id, timestamp, _id) index.
+        pipeline = [
+            {"$match": {"conversation_id": conversation_id}},
+            {"$sort": {"timestamp": 1, "_id": 1}},
+            {"$limit": max_messages},
+            {"$setWindowFields": {
+                "sortBy": {"timestamp": 1, "_id": 1},
+                "output": {
+                    "total_chars": {
+                        "$sum": {"$strLenCP": "$content"},
+                        "window": {"documents": ["unbounded", "current"]}
+                    }
+                }
+            }},
+            {"$match": {"total_chars": {"$lte": max_tokens_estimate * 4}}},
+            {"$project": {"_id": 0, "role": 1, "content": 1}},
+        ]
+        messages = list(collection.aggregate(pipeline))
         
         logger.info(f"Retrieved {len(messages)} messages for conversation {conversation_id}")
         return messages
@@ -23,6 +23,8 @@ class GitHubService:
             "Authorization": f"token {self.pat_token}" if self.pat_token else None
         }
         self.use_cache = use_cache
+        # Pooled connections so repeated API calls reuse the TLS connection
+        self.session = requests.Session()
         
         if not self.pat_token:
             logger.warning("GitHub PAT token not found in environment variables")
@@ -41,7 +43,7 @@ class GitHubService:
         """
         try:
             url = f"{self.base_url}{endpoint}"
-            response = requests.request(method, url, headers=self.headers, **kwargs)
+            response = self.session.request(method, url, headers=self.headers, **kwargs)
             response.raise_for_status()
             return response.json()
             
@@ -74,13 +76,16 @@ class GitHubService:
         
         try:
             repos = self._make_request("/user/repos", params={"per_page": 100, "sort": "updated"})
-            result = repos if repos else []
+            if repos is None:
+                # Request failed; don't cache so the next call retries
+                return []
             
-            # Cache the result
-            if self.use_cache and result:
-                github_cache.set(cache_key, result, ttl_seconds=300)  # 5 minutes
+            # Cache the result, including an empty list for users without
+            # repositories, so every chat turn doesn't hit /user/repos again
+            if self.use_cache:
+                github_cache.set(cache_key, repos, ttl_seconds=300)  # 5 minutes
             
-            return result
+            return repos
         except Exception as e:
             logger.error(f"Error fetching repositories: {str(e)}")
             return []
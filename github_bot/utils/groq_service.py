@@ -5,12 +5,29 @@ import os
 from groq import Groq
 from groq.types.chat import ChatCompletion
 import logging
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Tuple
 from github_bot.utils.database import save_error_log
 from github_bot.constants import SYSTEM_INSTRUCTION, GROQ_MODELS, DEFAULT_GROQ_MODEL
 
 logger = logging.getLogger(__name__)
 
+# Error codes returned by GroqService.chat_result()
+ERROR_NOT_CONFIGURED = "NOT_CONFIGURED"
+ERROR_RATE_LIMIT = "RATE_LIMIT"
+ERROR_MODEL = "MODEL"
+ERROR_AUTH = "AUTH"
+ERROR_NETWORK = "NETWORK"
+ERROR_UNKNOWN = "UNKNOWN"
+
+NOT_CONFIGURED_MESSAGE = "Groq service is not properly configured. Please check your API key."
+
+# System message for calls without repository context, built once and shared
+# (the SDK only reads the messages it is given)
+DEFAULT_SYSTEM_MESSAGE = {"role": "system", "content": SYSTEM_INSTRUCTION}
+
+# History roles forwarded to the model
+HISTORY_ROLES = frozenset(("user", "assistant"))
+
 
 class GroqServiceError(Exception):
     """Custom exception for Groq service errors."""
@@ -67,7 +84,7 @@ class GroqService:
         
         return GROQ_MODELS[model_id]
     
-    def _handle_error(self, error: Exception, prompt: str, model_id: Optional[int] = None) -> str:
+    def _handle_error(self, error: Exception, prompt: str, model_id: Optional[int] = None) -> Tuple[str, str]:
         """
         Handle errors with appropriate logging and user-friendly messages.
         
@@ -77,7 +94,7 @@ class GroqService:
             model_id: Model ID used (for logging)
         
         Returns:
-            User-friendly error message
+            Tuple of (error code, user-friendly error message)
         """
         error_msg = str(error)
         error_lower = error_msg.lower()
@@ -88,6 +105,7 @@ class GroqService:
         
         # Determine error type and context for saving log
         error_type = "GroqAPIError"
+        error_code = ERROR_UNKNOWN
         user_message = "An error occurred while processing your request. Please try again."
         context = {
             "prompt": prompt[:100],
@@ -97,24 +115,29 @@ class GroqService:
 
         if any(keyword in error_lower for keyword in ["quota", "429", "rate limit", "too many requests"]):
             error_type = "GroqQuotaError"
+            error_code = ERROR_RATE_LIMIT
             user_message = "I've reached my API quota limit. Please try again later or check your Groq API usage limits."
         
         elif any(keyword in error_lower for keyword in ["decommissioned", "no longer supported", "model_decommissioned"]):
             error_type = "GroqModelDecommissioned"
+            error_code = ERROR_MODEL
             replacement_model = GROQ_MODELS.get(DEFAULT_GROQ_MODEL)
             context["replacement_model"] = replacement_model
             user_message = f"The model '{model_name}' has been decommissioned. Please use model_id {DEFAULT_GROQ_MODEL} ({replacement_model}) instead."
         
         elif any(keyword in error_lower for keyword in ["404", "not found", "invalid model", "model not available"]):
             error_type = "GroqModelError"
+            error_code = ERROR_MODEL
             user_message = f"The AI model '{model_name}' is currently unavailable. Please try a different model or try again later."
         
         elif any(keyword in error_lower for keyword in ["401", "unauthorized", "authentication", "invalid api key"]):
             error_type = "GroqAuthError"
+            error_code = ERROR_AUTH
             user_message = "API authentication failed. Please check your API key configuration."
         
         elif any(keyword in error_lower for keyword in ["timeout", "timed out", "connection"]):
             error_type = "GroqConnectionError"
+            error_code = ERROR_NETWORK
             user_message = "Connection to AI service timed out. Please try again."
 
         # Save error log
@@ -124,7 +147,7 @@ class GroqService:
             context=context
         )
         
-        return user_message
+        return error_code, user_message
     
     def _validate_client(self) -> bool:
         """
@@ -145,6 +168,45 @@ class GroqService:
         
         return True
     
+    def _build_messages(
+        self,
+        prompt: str,
+        repository_context: Optional[str],
+        conversation_history: Optional[List[Dict[str, str]]],
+        system_instruction: Optional[str]
+    ) -> List[Dict[str, str]]:
+        """
+        Build the messages array for a chat completion.
+        
+        Args:
+            prompt: User's prompt/question
+            repository_context: Context appended to the system message
+            conversation_history: Previous messages with 'role' and 'content' keys
+            system_instruction: Custom system instruction (defaults to constant)
+        
+        Returns:
+            Messages list: system message, history, then the prompt
+        """
+        if repository_context or system_instruction:
+            base_system_message = system_instruction or SYSTEM_INSTRUCTION
+            if repository_context:
+                base_system_message += f"\n\n{repository_context}"
+            messages = [{"role": "system", "content": base_system_message}]
+        else:
+            messages = [DEFAULT_SYSTEM_MESSAGE]
+        
+        # Add conversation history if available
+        if conversation_history:
+            messages.extend(
+                {"role": msg["role"], "content": msg["content"]}
+                for msg in conversation_history
+                if msg.get("role") in HISTORY_ROLES
+            )
+        
+        # Add current user prompt
+        messages.append({"role": "user", "content": prompt})
+        return messages
+    
     def chat(
         self, 
         prompt: str, 
@@ -164,56 +226,68 @@ class GroqService:
             system_instruction: Optional custom system instruction (defaults to constant)
         
         Returns:
-            AI response as string or None if error
+            AI response, or a user-friendly error message if the call failed
+        """
+        _, text, _ = self.chat_result(
+            prompt,
+            repository_context=repository_context,
+            model_id=model_id,
+            conversation_history=conversation_history,
+            system_instruction=system_instruction
+        )
+        return text
+    
+    def chat_result(
+        self, 
+        prompt: str, 
+        repository_context: Optional[str] = None,
+        model_id: Optional[int] = None,
+        conversation_history: Optional[List[Dict[str, str]]] = None,
+        system_instruction: Optional[str] = None,
+        max_tokens: int = 1024
+    ) -> Tuple[bool, str, Optional[str]]:
+        """
+        Send a chat message to Groq AI and report whether it succeeded.
+        
+        Takes the same arguments as chat(), plus max_tokens to raise the
+        completion limit for requests that expect longer output.
+        
+        Returns:
+            Tuple of (ok, text, error_code). On failure text is a
+            user-friendly message and error_code one of the ERROR_* constants.
         """
         if not self._validate_client():
-            return "Groq service is not properly configured. Please check your API key."
+            return False, NOT_CONFIGURED_MESSAGE, ERROR_NOT_CONFIGURED
         
         try:
             model_name = self._get_model_name(model_id)
-            
-            # Build system message
-            base_system_message = system_instruction or SYSTEM_INSTRUCTION
-            if repository_context:
-                base_system_message += f"\n\n{repository_context}"
-            
-            # Build messages array
-            messages = [{"role": "system", "content": base_system_message}]
-            
-            # Add conversation history if available
-            if conversation_history:
-                for msg in conversation_history:
-                    if msg.get("role") in ["user", "assistant"]:
-                        messages.append({
-                            "role": msg["role"],
-                            "content": msg["content"]
-                        })
-            
-            # Add current user prompt
-            messages.append({"role": "user", "content": prompt})
+            messages = self._build_messages(
+                prompt, repository_context, conversation_history, system_instruction
+            )
             
             # Generate response
             response: ChatCompletion = self.client.chat.completions.create(
                 model=model_name,
                 messages=messages,
                 temperature=0.7,
-                max_tokens=1024,
+                max_tokens=max_tokens,
             )
             
             # Validate response
             if not response or not response.choices:
                 logger.warning("Empty response from Groq")
-                return "I apologize, but I couldn't generate a response. Please try again."
+                return True, "I apologize, but I couldn't generate a response. Please try again.", None
             
             content = response.choices[0].message.content
             if not content:
                 logger.warning("Empty content in Groq response")
-                return "I apologize, but I couldn't generate a response. Please try again."
+                return True, "I apologize, but I couldn't generate a response. Please try again.", None
             
-            return content.strip()
+            return True, content.strip(), None
                 
         except Exception as e:
-            return self._handle_error(e, prompt, model_id)
+            error_code, user_message = self._handle_error(e, prompt, model_id)
+            return False, user_message, error_code
     
     def chat_stream(
         self, 
@@ -228,31 +302,14 @@ class GroqService:
         Yields chunks of text as they arrive.
         """
         if not self._validate_client():
-            yield "Groq service is not properly configured. Please check your API key."
+            yield NOT_CONFIGURED_MESSAGE
             return
         
         try:
             model_name = self._get_model_name(model_id)
-            
-            # Build system message
-            base_system_message = system_instruction or SYSTEM_INSTRUCTION
-            if repository_context:
-                base_system_message += f"\n\n{repository_context}"
-            
-            # Build messages array
-            messages = [{"role": "system", "content": base_system_message}]
-            
-            # Add conversation history
-            if conversation_history:
-                for msg in conversation_history:
-                    if msg.get("role") in ["user", "assistant"]:
-                        messages.append({
-                            "role": msg["role"],
-                            "content": msg["content"]
-                        })
-            
-            # Add current prompt
-            messages.append({"role": "user", "content": prompt})
+            messages = self._build_messages(
+                prompt, repository_context, conversation_history, system_instruction
+            )
             
             # Create streaming completion
             stream = self.client.chat.completions.create(
@@ -269,6 +326,6 @@ class GroqService:
                     yield chunk.choices[0].delta.content
                     
         except Exception as e:
-            error_msg = self._handle_error(e, prompt, model_id)
+            _, error_msg = self._handle_error(e, prompt, model_id)
             yield error_msg
 
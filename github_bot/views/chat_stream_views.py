@@ -7,7 +7,7 @@ from django.http import StreamingHttpResponse
 from django.views import View
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
-from github_bot.utils.chat_service import ChatService
+from github_bot.utils.chat_service import get_chat_service
 
 logger = logging.getLogger(__name__)
 
@@ -54,7 +54,7 @@ class ChatStreamView(View):
     def _stream_chat(self, prompt, model_id, conversation_id, clear_history):
         """Generator for streaming chat responses."""
         try:
-            chat_service = ChatService()
+            chat_service = get_chat_service()
             
             # Process chat with streaming
             for chunk in chat_service.process_chat_stream(
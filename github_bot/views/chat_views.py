@@ -7,7 +7,7 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from github_bot.serializers import ChatRequestSerializer, ChatResponseSerializer
-from github_bot.utils.chat_service import ChatService
+from github_bot.utils.chat_service import get_chat_service
 from github_bot.utils.database import save_request_log, save_error_log
 
 logger = logging.getLogger(__name__)
@@ -37,7 +37,7 @@ class ChatAPIView(APIView):
         {
             "success": true,
             "response": "You have access to...",
-            "conversation_id": "uuid-or-provided-id",
+            "conversation_id": "generated-or-provided-id",
             "metadata": {
                 "duration_ms": 1234.56,
                 "prompt_length": 25,
@@ -46,7 +46,7 @@ class ChatAPIView(APIView):
             }
         }
         """
-        start_time = time.time()
+        start_time = time.perf_counter()
         request_data = request.data
         
         # Validate request
@@ -69,7 +69,7 @@ class ChatAPIView(APIView):
         
         try:
             # Process chat request
-            chat_service = ChatService()
+            chat_service = get_chat_service()
             result = chat_service.process_chat(
                 prompt=prompt, 
                 model_id=model_id,
@@ -78,7 +78,7 @@ class ChatAPIView(APIView):
             )
             
             # Calculate duration
-            duration_ms = (time.time() - start_time) * 1000
+            duration_ms = (time.perf_counter() - start_time) * 1000
             
             # Prepare response
             response_data = {
@@ -126,7 +126,7 @@ class ChatAPIView(APIView):
                 context={"prompt": prompt[:100]}
             )
             
-            duration_ms = (time.time() - start_time) * 1000
+            duration_ms = (time.perf_counter() - start_time) * 1000
             
             return Response(
                 {
@@ -34,7 +34,7 @@ class CodeReviewAPIView(APIView):
     
     def post(self, request):
         """Handle code review requests."""
-        start_time = time.time()
+        start_time = time.perf_counter()
         
         try:
             # Validate request
@@ -61,7 +61,7 @@ class CodeReviewAPIView(APIView):
                 model_id=validated_data.get("model_id")
             )
             
-            duration_ms = (time.time() - start_time) * 1000
+            duration_ms = (time.perf_counter() - start_time) * 1000
             logger.info(f"Code review completed in {duration_ms:.2f}ms")
             
             # Add metadata
@@ -102,7 +102,7 @@ class FileReviewAPIView(APIView):
     
     def post(self, request):
         """Handle file review requests."""
-        start_time = time.time()
+        start_time = time.perf_counter()
         
         try:
             # Validate request
@@ -142,7 +142,7 @@ class FileReviewAPIView(APIView):
                 model_id=validated_data.get("model_id")
             )
             
-            duration_ms = (time.time() - start_time) * 1000
+            duration_ms = (time.perf_counter() - start_time) * 1000
             logger.info(f"File review completed in {duration_ms:.2f}ms")
             
             # Add metadata
@@ -184,7 +184,7 @@ class ImprovementSuggestionsAPIView(APIView):
     
     def post(self, request):
         """Handle improvement suggestion requests."""
-        start_time = time.time()
+        start_time = time.perf_counter()
         
         try:
             # Validate request
@@ -211,7 +211,7 @@ class ImprovementSuggestionsAPIView(APIView):
                 model_id=validated_data.get("model_id")
             )
             
-            duration_ms = (time.time() - start_time) * 1000
+            duration_ms = (time.perf_counter() - start_time) * 1000
             logger.info(f"Improvement suggestions generated in {duration_ms:.2f}ms")
             
             # Add metadata